@@ -1,10 +1,247 @@
-class Animation():
-	def __init__(self):
-		self.animations = []
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
 
-	def createAnimation():
-		self.animations.append([])
-		return len(self.animations) - 1
+"""
+Pitfall v1.0
+By Danilo Lekovic for Game Design 12
 
-	def createSlides(index, slides):
-		self.animations[index] = slides
\ No newline at end of file
+animation.py
+
+Time based animation. A clip is what an animation looks like and
+is shared by everything that plays it, an animation is one thing
+playing a clip and the animator moves every animation on at once:
+
+    clip = Clip(Coin.frames, 0.1)
+    animation = Animation(clip)
+    animator.add(animation)
+    ...
+    animator.advance(dt)
+    screen.blit(animation.image(), pos)
+"""
+
+# Modes
+#   LOOP      1 2 3 1 2 3 ...
+#   PINGPONG  1 2 3 3 2 1 1 2 3 ...
+#   ONCE      1 2 3 and stays on 3
+
+LOOP = 'loop'
+PINGPONG = 'pingpong'
+ONCE = 'once'
+
+# Floating point slack, a step of 1/60 s added up three times
+# should count as 3/60 s
+
+EPSILON = 1e-09
+
+
+# Clip
+# Frames of a FrameTable in the order they are shown and how long
+# each one is shown for (in seconds). Never changes once it's made,
+# so any number of animations can share one:
+#
+#     frames     FrameTable the images come from
+#     duration   seconds every frame is shown for, a list with one
+#                for every point of the clip, or None for a clip
+#                that never moves on
+#     mode       LOOP, PINGPONG or ONCE
+#     order      frames used, in order (all of them if None)
+#     start      point of the clip animations start from
+
+class Clip:
+
+    __slots__ = ('frames', 'sequence', 'durations', 'mode', 'start')
+
+    def __init__(
+        self,
+        frames,
+        duration=None,
+        mode=LOOP,
+        order=None,
+        start=0,
+        ):
+        if order is None:
+            order = range(len(frames))
+
+        sequence = tuple(order)
+
+        if mode == PINGPONG:
+            sequence += sequence[::-1]
+        elif mode not in (LOOP, ONCE):
+            raise ValueError('unknown animation mode {}'.format(mode))
+
+        if not sequence:
+            raise ValueError('a clip needs at least one frame')
+
+        if isinstance(duration, (list, tuple)):
+            durations = tuple(duration)
+
+            if len(durations) != len(sequence):
+                raise ValueError('clip has {} frames but {} '
+                                 'durations'.format(len(sequence),
+                                 len(durations)))
+        else:
+            durations = (duration, ) * len(sequence)
+
+        if not 0 <= start < len(sequence):
+            raise ValueError('clip has no point {}'.format(start))
+
+        setter = object.__setattr__
+        setter(self, 'frames', frames)
+        setter(self, 'sequence', sequence)
+        setter(self, 'durations', durations)
+        setter(self, 'mode', mode)
+        setter(self, 'start', start)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('clips are shared and cannot be changed')
+
+    def __len__(self):
+        return len(self.sequence)
+
+    # Whether the clip ever moves on from its first frame
+
+    def still(self):
+        return self.durations[0] is None
+
+    # Image at a point of the clip
+
+    def image(self, index, flipped=False):
+        return self.frames.frame(self.sequence[index], flipped)
+
+
+# Animation
+# Something playing a clip: where it's at and for how long it's
+# been there. ended is called with the animation every time the
+# clip gets to its end (once for ONCE clips, every time around for
+# the others), that's how a pit knows it's done closing
+
+class Animation:
+
+    __slots__ = ('clip', 'index', 'time', 'done', 'ended')
+
+    def __init__(self, clip, ended=None):
+        self.ended = ended
+        self.done = False
+        self.play(clip)
+
+    # Starts playing clip from its start
+    # keep carries on from the same point (and time) of the clip
+    # playing now instead, for clips that take turns like the
+    # player's
+
+    def play(self, clip, keep=False):
+        if keep:
+            if self.clip is clip:
+                return
+
+            if self.index >= len(clip):
+                self.index = 0
+
+            duration = clip.durations[self.index]
+
+            if duration is not None:
+                self.time %= duration
+        else:
+            self.index = clip.start
+            self.time = 0.0
+
+        self.clip = clip
+        self.done = False
+
+    # Plays clip once the ONCE clip playing now has ended, as late
+    # as that one ended, so clips played one after another stay in
+    # time
+
+    def chain(self, clip):
+        late = (self.time if self.done else 0.0)
+        self.play(clip)
+        self.time = late
+
+    # Frame the animation is on
+
+    def frame(self):
+        return self.clip.sequence[self.index]
+
+    def image(self, flipped=False):
+        return self.clip.image(self.index, flipped)
+
+    # Moves on by dt seconds
+    # Returns whether the clip got to its end
+
+    def step(self, dt):
+        clip = self.clip
+
+        if self.done or clip.durations[0] is None:
+            return False
+
+        durations = clip.durations
+        last = len(durations) - 1
+        ended = False
+        self.time += dt
+
+        while self.time >= durations[self.index] - EPSILON:
+            self.time -= durations[self.index]
+
+            if self.index < last:
+                self.index += 1
+                continue
+
+            ended = True
+
+            if clip.mode == ONCE:
+                self.done = True
+                break
+
+            self.index = 0
+
+        return ended
+
+
+# Animator
+# Moves every animation it has on at once. Animations added
+# during a step start moving the step after, so something that
+# shows up in the middle of a step starts from its first frame
+#
+# Play calls advance(dt) at the start of every step
+
+class Animator:
+
+    def __init__(self):
+        self.animations = {}
+        self.starting = {}
+
+    def __len__(self):
+        return len(self.animations) + len(self.starting)
+
+    def __contains__(self, animation):
+        return animation in self.animations or animation \
+            in self.starting
+
+    def add(self, animation):
+        if animation not in self.animations:
+            self.starting[animation] = True
+
+    def remove(self, animation):
+        self.animations.pop(animation, None)
+        self.starting.pop(animation, None)
+
+    def clear(self):
+        self.animations.clear()
+        self.starting.clear()
+
+    # Moves every animation on by dt seconds
+    # Returns the animations that got to the end of their clip,
+    # their ended is called once everything has moved
+
+    def advance(self, dt):
+        ended = [animation for animation in self.animations
+                 if animation.step(dt)]
+
+        self.animations.update(self.starting)
+        self.starting.clear()
+
+        for animation in ended:
+            if animation.ended is not None:
+                animation.ended(animation)
+
+        return ended
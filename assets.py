@@ -0,0 +1,335 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Pitfall v1.0
+By Danilo Lekovic for Game Design 12
+
+assets.py
+
+Shared asset caches so every image and sound is only decoded once
+"""
+
+import os
+import pygame
+from collections import OrderedDict
+from atlas import Atlas
+
+
+# The image cache hands out one surface per path to everybody
+# that asks for it. Surfaces are converted to the display format
+# the first time they are loaded so blitting them is cheap.
+#
+# Sprites that were baked into the texture atlas come out of the
+# atlas sheets instead of their own files (see atlas.py).
+#
+# Cached surfaces are shared, so nobody is allowed to draw on them!
+# Copy a surface first if it needs to be changed.
+
+class ImageCache:
+
+    # Initialize class
+    # Budget is the number of bytes of pixel data we keep around
+
+    def __init__(self, budget=64 * 1024 * 1024, atlas=None):
+        self.budget = budget
+        self.atlas = atlas
+        self.surfaces = OrderedDict()
+        self.bytesUsed = 0
+
+        # Statistics
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # Returns the surface for path, loading it if needed
+
+    def load(self, path):
+        surface = self.lookup(path)
+
+        if surface is None:
+            if self.atlas is not None and path in self.atlas:
+                surface = self.atlas.get(path)
+            else:
+                surface = self.convert(pygame.image.load(path))
+
+            self.store(path, surface)
+
+        return surface
+
+    # Returns the mirrored image of path (facing the other way)
+    # It is only flipped once and then cached like any other image
+
+    def loadFlipped(self, path):
+        key = (path, 'flipped')
+        surface = self.lookup(key)
+
+        if surface is None:
+            surface = pygame.transform.flip(self.load(path), True, False)
+            self.store(key, surface)
+
+        return surface
+
+    # Finds a cached surface and counts the hit or miss
+
+    def lookup(self, key):
+        surface = self.surfaces.get(key)
+
+        if surface is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.surfaces.move_to_end(key)
+
+        return surface
+
+    # Adds a surface to the cache
+
+    def store(self, key, surface):
+        self.surfaces[key] = surface
+        self.bytesUsed += self.sizeOf(surface)
+        self.evict()
+
+    # Converts a freshly loaded image to the display format
+    # Images without any see-through pixels don't need alpha
+    # and are converted to the faster opaque format
+
+    def convert(self, surface):
+        if pygame.display.get_surface() is None:
+            return surface
+
+        if surface.get_flags() & pygame.SRCALPHA:
+            (width, height) = surface.get_size()
+            opaque = pygame.mask.from_surface(surface, 254).count()
+
+            if opaque == width * height:
+                return surface.convert()
+
+            return surface.convert_alpha()
+
+        return surface.convert()
+
+    # Number of bytes a surface takes up
+    # Atlas sprites share the pixels of their sheet
+
+    def sizeOf(self, surface):
+        if surface.get_parent() is not None:
+            return 0
+
+        return surface.get_pitch() * surface.get_height()
+
+    # Drops the least recently used surfaces until we
+    # are back under budget. The newest surface always stays
+
+    def evict(self):
+        while self.bytesUsed > self.budget and len(self.surfaces) > 1:
+            (path, surface) = self.surfaces.popitem(last=False)
+            self.bytesUsed -= self.sizeOf(surface)
+            self.evictions += 1
+
+    # Empties the cache
+
+    def clear(self):
+        self.surfaces.clear()
+        self.bytesUsed = 0
+
+    # Cache statistics, handy for debugging
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'images': len(self.surfaces),
+            'bytes': self.bytesUsed,
+            'budget': self.budget,
+            'atlas': (self.atlas.bytesUsed if self.atlas else 0),
+            }
+
+
+# Process-wide image cache
+
+images = ImageCache(atlas=Atlas())
+
+
+# A frame table holds the frames of one animation
+# It is shared by every entity of the same type and is only
+# loaded the first time an entity needs it, so advancing an
+# animation is just a change of index
+
+class FrameTable:
+
+    def __init__(self, paths):
+        self.paths = paths
+        self.frames = None
+        self.flippedFrames = None
+
+        # Rectangle sizes for each frame are cached as well
+
+        self.sizes = None
+
+    # Loads every frame through the image cache (only once)
+
+    def load(self):
+        if self.frames is None:
+            self.frames = [images.load(path) for path in self.paths]
+            self.sizes = [frame.get_size() for frame in self.frames]
+
+        return self
+
+    # Frames facing the other way, made the first time
+    # something needs to face left
+
+    def mirrored(self):
+        if self.flippedFrames is None:
+            self.flippedFrames = [images.loadFlipped(path) for path in
+                                  self.paths]
+
+        return self.flippedFrames
+
+    # Returns a frame for either orientation
+
+    def frame(self, index, flipped=False):
+        if flipped:
+            return self.mirrored()[index]
+
+        return self.frames[index]
+
+    def __getitem__(self, index):
+        return self.frames[index]
+
+    def __len__(self):
+        return len(self.paths)
+
+
+# Sound bank
+# Every sound effect is decoded once and the same Sound is handed to
+# every screen that asks for it. Screens get an Effect, which doesn't
+# touch the file until it's first played (or preload() is called),
+# so making a screen does no audio file I/O.
+#
+# Effects play on the mixer's channels in turn instead of asking
+# pygame for a new Channel every time. If they are all busy the one
+# that started longest ago is cut off
+
+class SoundBank:
+
+    def __init__(self):
+        self.sounds = {}
+        self.effects = {}
+        self.channels = None
+        self.nextChannel = 0
+
+        # Statistics
+
+        self.loads = 0
+        self.plays = 0
+
+    # The shared Sound for path, loaded the first time it's needed
+    # None if there is no sound system
+
+    def get(self, path):
+        sound = self.sounds.get(path)
+
+        if sound is None and pygame.mixer.get_init():
+            sound = self.sounds[path] = pygame.mixer.Sound(path)
+            self.loads += 1
+
+        return sound
+
+    # Something that plays path, the same one for everybody
+
+    def effect(self, path):
+        effect = self.effects.get(path)
+
+        if effect is None:
+            effect = self.effects[path] = Effect(self, path)
+
+        return effect
+
+    # Loads paths now instead of when they're first played (every
+    # effect asked for so far if paths is None)
+
+    def preload(self, paths=None):
+        if paths is None:
+            paths = list(self.effects)
+
+        for path in paths:
+            self.get(path)
+
+    # A channel that isn't playing anything, or the one that started
+    # longest ago
+
+    def channel(self):
+        if self.channels is None:
+            self.channels = [pygame.mixer.Channel(i) for i in
+                             range(pygame.mixer.get_num_channels())]
+
+        count = len(self.channels)
+
+        for i in range(count):
+            index = (self.nextChannel + i) % count
+
+            if not self.channels[index].get_busy():
+                break
+        else:
+            index = self.nextChannel
+
+        self.nextChannel = (index + 1) % count
+
+        return self.channels[index]
+
+    def play(self, path):
+        sound = self.get(path)
+
+        if sound is None:
+            return None
+
+        channel = self.channel()
+        channel.play(sound)
+        self.plays += 1
+
+        return channel
+
+    def stats(self):
+        return {
+            'sounds': len(self.sounds),
+            'loads': self.loads,
+            'plays': self.plays,
+            }
+
+
+# A sound effect from the bank, played with play() like a Sound
+
+class Effect:
+
+    __slots__ = ('bank', 'path')
+
+    def __init__(self, bank, path):
+        self.bank = bank
+        self.path = path
+
+    def sound(self):
+        return self.bank.get(self.path)
+
+    def play(self):
+        return self.bank.play(self.path)
+
+
+# Process-wide sound bank
+
+sounds = SoundBank()
+
+
+# Starts a music track
+# Music files are big and aren't shipped with every copy of
+# the game, so a missing track just means no music
+
+def playMusic(path, loops=0):
+    if not pygame.mixer.get_init() or not os.path.exists(path):
+        return
+
+    pygame.mixer.music.load(path)
+    pygame.mixer.music.play(loops)
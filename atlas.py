@@ -0,0 +1,196 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Pitfall v1.0
+By Danilo Lekovic for Game Design 12
+
+atlas.py
+
+Texture atlas packer and loader. Bakes the small sprites into a
+few big sheets so the game only has to read a handful of files:
+
+    python atlas.py
+
+Run it again whenever a sprite changes.
+"""
+
+import os
+import json
+import pygame
+
+# Where the sheets and their index are kept
+
+ATLAS_FOLDER = 'Sprites/Atlas'
+INDEX_FILE = 'index.json'
+
+# Size of every sheet, and the biggest sprite we bother packing
+# (backgrounds are as big as the screen and stay on their own)
+
+SHEET_SIZE = 2048
+MAX_SPRITE = 640
+
+
+# Turns a path into the form used as a key in the index
+
+def key(path):
+    return os.path.normpath(path).replace(os.sep, '/')
+
+
+# Packs sprites into shelves: tallest sprites first, left to right,
+# starting a new shelf when a row fills up and a new sheet when
+# a sheet fills up. Returns {name: (sheet, x, y, width, height)}
+
+def pack(sizes, sheetSize=SHEET_SIZE):
+    order = sorted(sizes, key=lambda name: (-sizes[name][1],
+                   -sizes[name][0], name))
+    placed = {}
+    sheet = 0
+    x = 0
+    y = 0
+    shelfHeight = 0
+
+    for name in order:
+        (width, height) = sizes[name]
+
+        if x + width > sheetSize:
+            x = 0
+            y += shelfHeight
+            shelfHeight = 0
+
+        if y + height > sheetSize:
+            sheet += 1
+            x = 0
+            y = 0
+            shelfHeight = 0
+
+        placed[name] = (sheet, x, y, width, height)
+        x += width
+        shelfHeight = max(shelfHeight, height)
+
+    return placed
+
+
+# Finds every sprite small enough to be packed
+
+def collect(folder='Sprites'):
+    paths = []
+
+    for (path, dirs, files) in os.walk(folder):
+        if key(path).startswith(ATLAS_FOLDER):
+            continue
+
+        for name in sorted(files):
+            if name.endswith('.png'):
+                paths.append(key(os.path.join(path, name)))
+
+    return sorted(paths)
+
+
+# Bakes the atlas sheets and the index file
+
+def build(folder='Sprites', output=ATLAS_FOLDER):
+    sprites = {}
+
+    for path in collect(folder):
+        image = pygame.image.load(path)
+        (width, height) = image.get_size()
+
+        if width <= MAX_SPRITE and height <= MAX_SPRITE:
+            sprites[path] = image
+
+    placed = pack(dict((path, image.get_size()) for (path, image) in
+                  sprites.items()))
+    sheets = max(sheet for (sheet, x, y, w, h) in placed.values()) + 1
+
+    if not os.path.exists(output):
+        os.makedirs(output)
+
+    index = {'sheets': [], 'sprites': {}}
+
+    for number in range(sheets):
+        used = [(x, y, w, h) for (sheet, x, y, w, h) in placed.values()
+                if sheet == number]
+        width = max(x + w for (x, y, w, h) in used)
+        height = max(y + h for (x, y, w, h) in used)
+        surface = pygame.Surface((width, height), pygame.SRCALPHA, 32)
+
+        for (path, (sheet, x, y, w, h)) in placed.items():
+            if sheet == number:
+                surface.blit(sprites[path], (x, y))
+
+        name = 'sheet{}.png'.format(number)
+        pygame.image.save(surface, os.path.join(output, name))
+        index['sheets'].append(name)
+
+    for (path, rect) in sorted(placed.items()):
+        index['sprites'][path] = list(rect)
+
+    with open(os.path.join(output, INDEX_FILE), 'w') as f:
+        json.dump(index, f, sort_keys=True)
+
+    return (len(sprites), sheets)
+
+
+# Runtime side of the atlas
+# Hands out subsurfaces of the baked sheets. Sheets are only read
+# the first time one of their sprites is asked for
+
+class Atlas:
+
+    def __init__(self, folder=ATLAS_FOLDER):
+        self.folder = folder
+        self.sheets = {}
+        self.rects = {}
+        self.sheetNames = []
+        self.bytesUsed = 0
+
+        indexPath = os.path.join(folder, INDEX_FILE)
+
+        if os.path.exists(indexPath):
+            with open(indexPath, 'r') as f:
+                index = json.load(f)
+
+            self.sheetNames = index['sheets']
+            self.rects = index['sprites']
+
+    # Whether path was baked into the atlas
+
+    def __contains__(self, path):
+        return key(path) in self.rects
+
+    # Returns a subsurface for path or None if it isn't in the atlas
+
+    def get(self, path):
+        rect = self.rects.get(key(path))
+
+        if rect is None:
+            return None
+
+        (sheet, x, y, width, height) = rect
+
+        return self.sheet(sheet).subsurface((x, y, width, height))
+
+    # Loads a sheet, converting it to the display format if we can
+
+    def sheet(self, number):
+        surface = self.sheets.get(number)
+
+        if surface is None:
+            surface = pygame.image.load(os.path.join(self.folder,
+                    self.sheetNames[number]))
+
+            if pygame.display.get_surface() is not None:
+                surface = surface.convert_alpha()
+
+            self.sheets[number] = surface
+            self.bytesUsed += surface.get_pitch() * surface.get_height()
+
+        return surface
+
+
+if __name__ == '__main__':
+    pygame.init()
+    (count, sheets) = build()
+    print('Packed {} sprites into {} sheet(s) in {}'.format(count,
+          sheets, ATLAS_FOLDER))
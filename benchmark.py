@@ -0,0 +1,533 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Pitfall v1.0
+By Danilo Lekovic for Game Design 12
+
+benchmark.py
+
+Benchmarks for the game's hot paths. Runs without a window:
+
+    python benchmark.py                          run the suite
+    python benchmark.py --json results.json      and save the results
+    python benchmark.py --baseline results.json  compare with old results
+    python benchmark.py --compare                old vs new code paths
+
+The suite prints the mean and percentiles of every benchmark in
+milliseconds. Comparing with a baseline exits with 1 if anything got
+slower than --threshold percent.
+"""
+
+import os
+
+# No window and no sound card needed
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import argparse
+import json
+import math
+import platform
+import random
+import sys
+import time
+import pygame
+
+from collections import OrderedDict
+from entity import *
+from player import Player
+from filemanager import FileManager
+import savefile
+import levelbank
+import entitystore
+import tempfile
+from glyphfont import GlyphFont
+
+
+# Sets up pygame the same way the game does, minus the window
+
+def setUp():
+    pygame.mixer.init()
+    pygame.init()
+    return pygame.display.set_mode((1080, 720))
+
+
+# Fills a level with lots of animated entities
+
+def denseLevel(play, count):
+    kinds = [(Barrel, 474), (Ghost, 605), (Rat, 679), (Snake, 466),
+             (Coin, 483), (Pit, 485)]
+    play.releaseLevel()
+
+    for i in range(count):
+        (kind, y) = kinds[i % len(kinds)]
+        play.level.append(kind(random.randint(140, 1010), y))
+
+    play.indexLevel()
+
+
+# This is how entities used to change sprites: a converted
+# copy of the frame on every single tick
+
+def legacyChangeSprite(self, index=None):
+    if index is None:
+        index = self.animation.index
+
+    self.image = self.animation.clip.image(index).convert_alpha()
+    self.rect = self.image.get_rect()
+    self.rect.move_ip(self.pos.x, self.pos.y)
+
+
+# Runs Play.update and Play.draw on a dense level and measures the time per
+# frame and how many bytes of new surfaces were made per frame
+
+def benchDraw(screen, count=300, frames=300, legacy=False):
+    from screen import Play, ScreenManager
+
+    animated = [Barrel, Ghost, Rat, Snake, Pit, Coin]
+    original = dict((kind, kind.changeSprite) for kind in animated)
+
+    if legacy:
+        for kind in animated:
+            kind.changeSprite = legacyChangeSprite
+
+    try:
+        random.seed(1)
+        play = Play(ScreenManager())
+        denseLevel(play, count)
+        shared = set()
+
+        for kind in animated:
+            shared.update(id(frame) for frame in kind.frames)
+
+        copied = 0
+        start = time.perf_counter()
+
+        for i in range(frames):
+
+            # The player can't die in the middle of a benchmark
+
+            play.player.health = 6
+            play.update(1.0 / 60)
+            play.draw(screen)
+
+            for element in play.level:
+                if id(element.image) not in shared:
+                    copied += element.image.get_pitch() \
+                        * element.image.get_height()
+
+        elapsed = time.perf_counter() - start
+    finally:
+        for kind in animated:
+            kind.changeSprite = original[kind]
+
+    return (elapsed / frames * 1000.0, copied / frames)
+
+
+# Renders the Play HUD text (coins, score, high score and the
+# power-up counter) the way Play.draw does, once per frame
+
+def benchHud(font, sFont, frames=600):
+
+    # Anything done once at start up isn't part of the frame cost
+
+    font.render('0', True, (255, 255, 255))
+    font.render('0', True, (255, 213, 0))
+    sFont.render('0', True, (255, 255, 255))
+
+    start = time.perf_counter()
+
+    for i in range(frames):
+
+        # Coins go up every now and then, the score less often
+
+        coins = 2993 + i // 20 * 10
+        score = i // 60 * 100
+
+        font.render(str(coins), True, (255, 255, 255))
+        sFont.render(str(3), True, (255, 255, 255))
+        font.render(str(score), True, (255, 255, 255))
+        font.render(str(1500), True, (255, 213, 0))
+
+    return (time.perf_counter() - start) / frames * 1000.0
+
+
+# Times function and returns one sample (in ms) per run
+# Every sample is the average of number calls. prepare runs before
+# every sample without being timed. The first call isn't counted,
+# it pays for filling the caches
+
+def measure(function, runs=100, number=1, prepare=None):
+    samples = []
+
+    if prepare is not None:
+        prepare()
+
+    function()
+
+    for i in range(runs):
+        if prepare is not None:
+            prepare()
+
+        start = time.perf_counter()
+
+        for j in range(number):
+            function()
+
+        samples.append((time.perf_counter() - start) * 1000.0 / number)
+
+    return samples
+
+
+# Value below which p percent of the sorted samples fall
+
+def percentile(samples, p):
+    index = int(round(p / 100.0 * (len(samples) - 1)))
+
+    return samples[index]
+
+
+# Mean, percentiles and spread of a list of samples
+
+def summarize(samples):
+    samples = sorted(samples)
+
+    return OrderedDict([
+        ('runs', len(samples)),
+        ('mean', sum(samples) / len(samples)),
+        ('p50', percentile(samples, 50)),
+        ('p90', percentile(samples, 90)),
+        ('p99', percentile(samples, 99)),
+        ('min', samples[0]),
+        ('max', samples[-1]),
+        ])
+
+
+# Every benchmark in the suite, each one timed on its own
+# Returns {name: summary}
+
+def suite(screen, runs=100):
+    from screen import Play, Store, MainMenu, ScreenManager
+
+    results = OrderedDict()
+    step = 1.0 / 60
+    random.seed(1)
+    play = Play(ScreenManager())
+
+    # Level generation, placing everything on the spot and then
+    # picking levels from a small bank (the old level goes back to
+    # the pools first, like in the game)
+
+    def emptyLevel():
+        play.releaseLevel()
+
+    play.useLevelBank = False
+
+    for kind in range(1, 5):
+        results['Play.createLevel kind {}'.format(kind)] = \
+            measure(lambda: play.createLevel(kind), runs,
+                    prepare=emptyLevel)
+
+    (levels, rejected) = levelbank.generate(64)
+    (handle, path) = tempfile.mkstemp(suffix='.bank')
+    os.close(handle)
+    levelbank.writeBank(path, levels)
+    levelbank.levelBank.use(path)
+    play.useLevelBank = True
+
+    try:
+        for kind in range(1, 5):
+            results['Play.createLevel bank kind {}'.format(kind)] = \
+                measure(lambda: play.createLevel(kind), runs,
+                        prepare=emptyLevel)
+    finally:
+        levelbank.levelBank.use(levelbank.PATH)
+        os.remove(path)
+
+    # Moving on to the next level, made when it's reached or ahead
+    # of time (then only the swap is timed)
+
+    def readyLevel():
+        play.prepare()
+
+    play.prepareLevels = False
+    results['Play.nextLevel on the spot'] = measure(play.nextLevel, runs)
+    play.prepareLevels = True
+    play.startNextLevel()
+    results['Play.nextLevel prepared'] = measure(play.nextLevel, runs,
+            prepare=readyLevel)
+
+    # A frame of the game, with more and more entities
+
+    def keepAlive():
+        play.player.health = 6
+
+    def stepGame():
+        keepAlive()
+        play.update(step)
+
+    for count in (10, 50, 200, 1000):
+        denseLevel(play, count)
+        play.buildScene()
+        results['Play.update {} entities'.format(count)] = \
+            measure(lambda: play.update(step), runs, prepare=keepAlive)
+        results['Play.draw {} entities'.format(count)] = \
+            measure(lambda: play.draw(screen), runs, prepare=stepGame)
+
+    # The same with the entity store (if there is NumPy)
+
+    if entitystore.available:
+        Play.useEntityStore = True
+        stored = Play(ScreenManager())
+        Play.useEntityStore = False
+
+        def keepStoredAlive():
+            stored.player.health = 6
+
+        def stepStored():
+            keepStoredAlive()
+            stored.update(step)
+
+        for count in (10, 50, 200, 1000):
+            denseLevel(stored, count)
+            stored.buildScene()
+            results['Play.update {} entities (store)'.format(count)] = \
+                measure(lambda: stored.update(step), runs,
+                        prepare=keepStoredAlive)
+            results['Play.draw {} entities (store)'.format(count)] = \
+                measure(lambda: stored.draw(screen), runs,
+                        prepare=stepStored)
+
+    # Entities on their own
+
+    kinds = [(Barrel, 474), (Ghost, 605), (Rat, 679), (Snake, 466),
+             (Pit, 485), (Wall, 584), (Ladder, 492), (Coin, 483)]
+
+    for (kind, y) in kinds:
+        element = kind(500, y)
+        results['{}.update'.format(kind.__name__)] = \
+            measure(element.update, runs, number=100)
+
+    # Every animation moving on at once
+
+    animator = Animator()
+
+    for i in range(1000):
+        animator.add(Animation(Ghost.sprite.clip))
+
+    animator.advance(step)
+    results['Animator.advance 1000 animations'] = \
+        measure(lambda: animator.advance(step), runs)
+
+    # The player
+
+    player = Player(60, 400)
+    results['Player.update'] = measure(player.update, runs, number=100)
+    results['Player.load'] = measure(player.load, runs)
+
+    # Save file (edit switches between two values so that every
+    # edit really changes something)
+
+    coins = FileManager.readOption('Coins')
+    edits = [0]
+
+    def edit():
+        edits[0] += 1
+        FileManager.edit('Coins', coins + edits[0] % 2)
+
+    results['FileManager.readOption'] = \
+        measure(lambda: FileManager.readOption('Coins'), runs)
+    results['FileManager.edit'] = measure(edit, runs)
+
+    def saveAll():
+        with FileManager.batch():
+            for option in ['Coins', '2x Coins', '4x Coins', 'Dead Zone',
+                           'Extra Life', 'High Score']:
+                FileManager.edit(option, FileManager.readOption(option)
+                                 + 1)
+
+    results['FileManager.batch (6 edits)'] = measure(saveAll, runs)
+
+    values = FileManager.load()
+    data = savefile.encode(values)
+    results['savefile.encode'] = measure(lambda: savefile.encode(values),
+                                         runs, number=100)
+    results['savefile.decode'] = measure(lambda: savefile.decode(data),
+                                         runs, number=100)
+
+    # Menus
+
+    results['Store()'] = measure(lambda: Store(ScreenManager()), runs)
+    results['MainMenu()'] = measure(lambda: MainMenu(ScreenManager()),
+                                    runs)
+
+    return OrderedDict((name, summarize(samples)) for (name, samples) in
+                       results.items())
+
+
+# Prints a table of results, with the change in mean time when
+# there is a baseline. Returns the names of benchmarks that got
+# slower than threshold percent
+
+def report(results, baseline=None, threshold=10.0):
+    slower = []
+
+    print('{:<34} {:>9} {:>9} {:>9} {:>9}'.format('benchmark (ms)',
+          'mean', 'p50', 'p90', 'p99'))
+
+    for (name, result) in results.items():
+        line = '{:<34} {:9.4f} {:9.4f} {:9.4f} {:9.4f}'.format(name,
+                result['mean'], result['p50'], result['p90'],
+                result['p99'])
+
+        if baseline is not None and name in baseline:
+            before = baseline[name]['mean']
+            change = (result['mean'] - before) / max(before, 1e-09) \
+                * 100.0
+            line += ' {:+7.1f}%'.format(change)
+
+            if change > threshold:
+                line += ' slower'
+                slower.append(name)
+
+        print(line)
+
+    return slower
+
+
+# Collision queries with and without the grid as levels get
+# denser. Prints one row per entity count: checking every entity
+# against the player, asking the grid, finding the nearest ladder
+# both ways, and keeping the grid up to date as everything moves
+
+def benchScaling(counts=(10, 100, 1000, 5000), runs=50):
+    from screen import Play, ScreenManager
+
+    random.seed(1)
+    play = Play(ScreenManager())
+    print('  {:>8} {:>10} {:>10} {:>10} {:>10} {:>10}'.format('entities',
+          'scan', 'grid', 'scan near', 'grid near', 'grid move'))
+
+    for count in counts:
+        denseLevel(play, count)
+
+        for i in range(max(1, count // 50)):
+            play.level.append(Ladder(random.randint(140, 1010), 492))
+
+        play.indexLevel()
+        rect = play.player.rect
+        (x, y) = rect.center
+
+        def scan():
+            return [element for element in play.level
+                    if element.rect.colliderect(rect)]
+
+        def scanNearest():
+            ladders = [element for element in play.level
+                       if isinstance(element, Ladder)]
+
+            def distance(element):
+                return math.hypot(element.rect.centerx - x,
+                                  element.rect.centery - y)
+
+            return min(ladders, key=distance)
+
+        def shift():
+            for element in play.level:
+                element.rect.x -= 5
+
+        def move():
+            for element in play.level:
+                play.grid.move(element)
+
+        row = [summarize(measure(function, runs, prepare=prepare))['mean']
+               for (function, prepare) in [
+                   (scan, None),
+                   (lambda: play.grid.query(rect), None),
+                   (scanNearest, None),
+                   (lambda: play.grid.nearest(x, y, Ladder), None),
+                   (move, shift),
+                   ]]
+        print('  {:>8} {:10.4f} {:10.4f} {:10.4f} {:10.4f} {:10.4f}'.format(
+              len(play.level), *row))
+
+
+# The old way against the new way, for the earlier optimisations
+
+def compare(screen):
+    print('Play frame with a dense level (300 entities)')
+
+    for (name, legacy) in [('convert every frame', True),
+                           ('shared frame tables', False)]:
+        (ms, copied) = benchDraw(screen, legacy=legacy)
+        print('  {:<20} {:8.3f} ms/frame {:12.0f} bytes/frame'.format(name,
+              ms, copied))
+
+    print('HUD text per frame')
+
+    for (name, kind) in [('pygame.font.Font', pygame.font.Font),
+                         ('GlyphFont', GlyphFont)]:
+        ms = benchHud(kind('Pitfall.ttf', 24), kind('Pitfall.ttf', 16))
+        print('  {:<20} {:8.3f} ms/frame'.format(name, ms))
+
+    print('Collision queries (ms)')
+    benchScaling()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pitfall benchmarks')
+    parser.add_argument('--runs', type=int, default=100,
+                        help='samples taken of every benchmark')
+    parser.add_argument('--json', help='save the results to this file')
+    parser.add_argument('--baseline',
+                        help='compare with results saved by --json')
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help='percent slower that counts as slower')
+    parser.add_argument('--compare', action='store_true',
+                        help='old vs new code paths instead of the suite')
+    options = parser.parse_args()
+
+    screen = setUp()
+
+    if options.compare:
+        compare(screen)
+        pygame.quit()
+        return 0
+
+    # The save file is put back the way it was afterwards
+
+    with open('save.pitfall', 'rb') as f:
+        save = f.read()
+
+    try:
+        results = suite(screen, options.runs)
+    finally:
+        with open('save.pitfall', 'wb') as f:
+            f.write(save)
+
+    pygame.quit()
+
+    baseline = None
+
+    if options.baseline:
+        with open(options.baseline, 'r') as f:
+            baseline = json.load(f)['results']
+
+    slower = report(results, baseline, options.threshold)
+
+    if options.json:
+        with open(options.json, 'w') as f:
+            json.dump({
+                'python': platform.python_version(),
+                'pygame': pygame.version.ver,
+                'platform': platform.platform(),
+                'results': results,
+                }, f, indent=2)
+
+    return (1 if slower else 0)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,238 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Pitfall v1.0
+By Danilo Lekovic for Game Design 12
+
+broadphase.py
+
+Uniform grid over the level so collision checks only look at
+the entities close by instead of every single one
+"""
+
+import math
+
+
+# Spatial grid
+# The level is cut into square cells and every entity is filed
+# under each cell its rectangle touches, sorted by class so
+# looking for one kind of thing (a ladder, a wall) skips the rest.
+# Anything with a rect can go in. Moving entities call move() after they move, which only
+# does work when they cross into other cells.
+#
+# Cells are made as they are needed, so entities that walk off
+# the screen are fine
+
+class SpatialGrid:
+
+    # Initialize class
+
+    def __init__(self, cellSize=128):
+        self.cellSize = cellSize
+        self.cells = {}
+
+        # Cells every entity is in and the order they were added in
+        # (queries give entities back in that order)
+
+        self.spans = {}
+        self.order = {}
+        self.added = 0
+
+        # Cells that were ever used: [left, top, right, bottom]
+        # Searches don't go past these
+
+        self.bounds = None
+
+    # Range of cells a rect covers: (left, top, right, bottom)
+
+    def span(self, rect):
+        size = self.cellSize
+
+        return (rect.left // size, rect.top // size, (rect.right - 1)
+                // size, (rect.bottom - 1) // size)
+
+    def insert(self, element):
+        span = self.span(element.rect)
+        self.spans[element] = span
+        self.order[element] = self.added
+        self.added += 1
+        self.file(element, span)
+
+    def remove(self, element):
+        span = self.spans.pop(element, None)
+
+        if span is not None:
+            del self.order[element]
+            self.unfile(element, span)
+
+    # Call after element's rect might have changed
+    # Most of the time it's still in the same cells
+
+    def move(self, element):
+        rect = element.rect
+        size = self.cellSize
+        span = (rect.left // size, rect.top // size, (rect.right - 1)
+                // size, (rect.bottom - 1) // size)
+        old = self.spans[element]
+
+        if span != old:
+            self.unfile(element, old)
+            self.file(element, span)
+            self.spans[element] = span
+
+    def clear(self):
+        self.cells.clear()
+        self.spans.clear()
+        self.order.clear()
+        self.bounds = None
+
+    def __len__(self):
+        return len(self.spans)
+
+    def __contains__(self, element):
+        return element in self.spans
+
+    # Puts element into every cell of span
+
+    def file(self, element, span):
+        (left, top, right, bottom) = span
+
+        for x in range(left, right + 1):
+            for y in range(top, bottom + 1):
+                cell = self.cells.get((x, y))
+
+                if cell is None:
+                    cell = self.cells[(x, y)] = {}
+                    self.grow(x, y)
+
+                group = cell.get(type(element))
+
+                if group is None:
+                    group = cell[type(element)] = set()
+
+                group.add(element)
+
+    def grow(self, x, y):
+        if self.bounds is None:
+            self.bounds = [x, y, x, y]
+        else:
+            bounds = self.bounds
+            bounds[0] = min(bounds[0], x)
+            bounds[1] = min(bounds[1], y)
+            bounds[2] = max(bounds[2], x)
+            bounds[3] = max(bounds[3], y)
+
+    # Takes element out of every cell of span
+
+    def unfile(self, element, span):
+        (left, top, right, bottom) = span
+
+        for x in range(left, right + 1):
+            for y in range(top, bottom + 1):
+                cell = self.cells[(x, y)]
+                group = cell[type(element)]
+                group.discard(element)
+
+                if not group:
+                    del cell[type(element)]
+
+                    if not cell:
+                        del self.cells[(x, y)]
+
+    # Entities of a class (or of any class) filed in a cell
+
+    def entities(self, cell, kind=None):
+        groups = self.cells.get(cell)
+
+        if not groups:
+            return ()
+
+        if kind is not None:
+            return groups.get(kind, ())
+
+        if len(groups) == 1:
+            for group in groups.values():
+                return group
+
+        found = set()
+
+        for group in groups.values():
+            found.update(group)
+
+        return found
+
+    # Entities in the cells rect touches (they might not touch rect)
+
+    def candidates(self, rect, kind=None):
+        (left, top, right, bottom) = self.span(rect)
+        found = set()
+
+        for x in range(left, right + 1):
+            for y in range(top, bottom + 1):
+                found.update(self.entities((x, y), kind))
+
+        return found
+
+    # Entities touching rect, in the order they were added
+    # kind only returns entities of exactly that class
+
+    def query(self, rect, kind=None):
+        found = [element for element in self.candidates(rect, kind)
+                 if element.rect.colliderect(rect)]
+        found.sort(key=self.order.get)
+
+        return found
+
+    # Closest entity of a kind to (x, y), or None
+    # Looks in rings of cells around the point, moving out until
+    # nothing closer can be left
+
+    def nearest(self, x, y, kind=None):
+        if self.bounds is None:
+            return None
+
+        size = self.cellSize
+        (cx, cy) = (int(x // size), int(y // size))
+        (left, top, right, bottom) = self.bounds
+        lastRing = max(cx - left, right - cx, cy - top, bottom - cy)
+        best = None
+        bestDistance = None
+        ring = 0
+
+        while ring <= lastRing:
+            for cell in self.ring(cx, cy, ring):
+                for element in self.entities(cell, kind):
+                    (ex, ey) = element.rect.center
+                    distance = math.hypot(ex - x, ey - y)
+
+                    if bestDistance is None or distance < bestDistance:
+                        best = element
+                        bestDistance = distance
+
+            # Everything in later rings is at least this far away
+
+            if best is not None and bestDistance <= ring * size:
+                break
+
+            ring += 1
+
+        return best
+
+    # Cells at exactly ring steps from (cx, cy)
+
+    def ring(self, cx, cy, ring):
+        if ring == 0:
+            return [(cx, cy)]
+
+        cells = []
+
+        for x in range(cx - ring, cx + ring + 1):
+            cells.append((x, cy - ring))
+            cells.append((x, cy + ring))
+
+        for y in range(cy - ring + 1, cy + ring):
+            cells.append((cx - ring, y))
+            cells.append((cx + ring, y))
+
+        return cells
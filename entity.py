@@ -8,361 +8,344 @@ By Danilo Lekovic for Game Design 12
 entity.py
 
 Class files representing different entities
+
+Most entities are the same thing with different pictures, speeds
+and timings, so they are all one AnimatedSprite made from a
+SpriteDefinition instead of classes of their own
 """
 
 import pygame as pg
+from assets import FrameTable
+from animation import *
 
 # Using Pygame's built-in vectors
 
 vec = pg.math.Vector2
 
 
-# Barrel are found above ground
-# Player has to jump over these
-# Barrels also roll
+# Entity pool
+# Entities taken out of the level are kept by their kind's pool and
+# handed out again instead of making new ones:
+#
+#     coin = Coin.pool.acquire(500, 483)
+#     ...
+#     coin.release()
+#
+# acquire() calls reset(x, y) on the entity it gives back, which
+# leaves it the way __init__ does
 
-class Barrel(pg.sprite.Sprite):
+class Pool:
 
-    # Initialize class
+    def __init__(self, kind):
+        self.kind = kind
+        self.free = []
+        kind.pool = self
 
-    def __init__(self, x, y):
-        super().__init__()
+        # Statistics
 
-        # Handles animation
+        self.created = 0
+        self.reused = 0
+        self.released = 0
 
-        self.animationTimer = 0
-        self.animationIndex = 0
-        self.animations = \
-            {'All': [pg.image.load('Sprites/Environment/Barrel/1.png'),
-             pg.image.load('Sprites/Environment/Barrel/2.png')]}
-        self.pos = vec(x, y)
-        self.image = self.animations['All'][0].convert_alpha()
-        self.rect = self.image.get_rect()
-        self.rect.move_ip(x, y)
+    def acquire(self, x, y):
+        if self.free:
+            element = self.free.pop()
+            element.reset(x, y)
+            element.pooled = False
+            self.reused += 1
 
-    # Changes sprite
+            return element
 
-    def changeSprite(self, index=None):
-        if index is None:
-            index = self.animationIndex
+        self.created += 1
 
-        self.pos = vec(self.pos.x, self.pos.y)
-        self.image = self.animations['All'][index].convert_alpha()
-        self.rect = self.image.get_rect()
-        self.rect.move_ip(self.pos.x, self.pos.y)
-
-    # Updates in main loop
+        return self.kind(x, y)
 
-    def update(self):
-        if self.animationIndex == 0:
-            self.animationIndex = 1
-        else:
-            self.animationIndex = 0
+    def release(self, element):
+        if element.pooled:
+            raise ValueError('{} was already released'.format(
+                             self.kind.__name__))
 
-        self.changeSprite(self.animationIndex)
+        element.pooled = True
+        self.free.append(element)
+        self.released += 1
 
-        self.pos.x -= 10
+    def stats(self):
+        return {
+            'created': self.created,
+            'reused': self.reused,
+            'released': self.released,
+            'free': len(self.free),
+            }
 
 
-# Ghost are found underground
-# Player cannot touch these
-# Ghosts also move
+# Anything that goes back to a pool when it's done
 
-class Ghost(pg.sprite.Sprite):
+class Pooled:
 
-    # Initialize class
+    __slots__ = ('pooled', )
 
-    def __init__(self, x, y):
-        super().__init__()
+    def release(self):
+        self.pool.release(self)
 
-        # Handle animations
 
-        self.animationTimer = 0
-        self.animationIndex = 0
-        self.animations = \
-            {'All': [pg.image.load('Sprites/Environment/Ghost/1.png'),
-             pg.image.load('Sprites/Environment/Ghost/2.png')]}
-        self.pos = vec(x, y)
-        self.image = self.animations['All'][0].convert_alpha()
-        self.rect = self.image.get_rect()
-        self.rect.move_ip(x, y)
+# Sprite definition
+# What every entity of a kind has in common, shared by all of them
+# (only the position and animation belong to each entity):
+#
+#     paths     frames of the animation
+#     duration  seconds each frame is shown for, None for no
+#               animation
+#     mode      LOOP, PINGPONG or ONCE (see animation.py)
+#     start     point of the animation shown on the first step
+#     speed     pixels moved to the right every step
+#     hitbox    (x, y, width, height) of the part of the frame that
+#               collides, None for all of it
 
-    # Change sprite
+class SpriteDefinition:
 
-    def changeSprite(self, index=None):
-        if index is None:
-            index = self.animationIndex
+    __slots__ = ('frames', 'clip', 'speed', 'hitbox')
 
-        self.pos = vec(self.pos.x, self.pos.y)
-        self.image = self.animations['All'][index].convert_alpha()
-        self.rect = self.image.get_rect()
-        self.rect.move_ip(self.pos.x, self.pos.y)
+    def __init__(
+        self,
+        paths,
+        duration=None,
+        mode=LOOP,
+        start=0,
+        speed=0,
+        hitbox=None,
+        order=None,
+        ):
+        self.frames = FrameTable(paths)
+        self.clip = Clip(self.frames, duration, mode, order, start)
+        self.speed = speed
+        self.hitbox = hitbox
 
-    # Update in main loop
+    # Size of the rect at a point of the animation
 
-    def update(self):
-        self.animationTimer += 1
+    def size(self, index, clip=None):
+        if self.hitbox is not None:
+            return self.hitbox[2:]
 
-        self.changeSprite(self.animationIndex)
-        self.pos.x -= 5
+        if clip is None:
+            clip = self.clip
 
-        if self.animationTimer >= 3:
-            self.animationTimer = 0
+        return self.frames.sizes[clip.sequence[index]]
 
-            if self.animationIndex == 0:
-                self.animationIndex = 1
-            else:
-                self.animationIndex = 0
+    # Where the rect starts compared to the frame
 
+    def offset(self):
+        if self.hitbox is not None:
+            return self.hitbox[:2]
 
-# Rats are found underground
-# Player cannot touch these
-# Rats also move
+        return (0, 0)
 
-class Rat(pg.sprite.Sprite):
 
-    def __init__(self, x, y):
-        super().__init__()
-        self.animationTimer = 0
-        self.animationIndex = 0
-        self.animations = \
-            {'All': [pg.image.load('Sprites/Environment/Rat/1.png'),
-             pg.image.load('Sprites/Environment/Rat/2.png')]}
-        self.pos = vec(x, y)
-        self.image = self.animations['All'][0].convert_alpha()
-        self.rect = self.image.get_rect()
-        self.rect.move_ip(x, y)
+# Animated sprite
+# An entity of any kind, its kind's SpriteDefinition says what
+# it looks like and how it moves. Play's animator moves the
+# animation on, update() shows the frame it's at
 
-    def changeSprite(self, index=None):
-        if index is None:
-            index = self.animationIndex
+class AnimatedSprite(Pooled):
 
-        self.pos = vec(self.pos.x, self.pos.y)
-        self.image = self.animations['All'][index].convert_alpha()
-        self.rect = self.image.get_rect()
-        self.rect.move_ip(self.pos.x, self.pos.y)
+    __slots__ = ('pos', 'rect', 'image', 'animation', 'flipped')
 
-    def update(self):
-        self.animationTimer += 1
+    sprite = None
 
-        self.changeSprite(self.animationIndex)
-        self.pos.x -= 8
+    # Initialize class
 
-        if self.animationTimer >= 3:
-            self.animationTimer = 0
+    def __init__(self, x, y):
+        self.frames.load()
+        self.pos = vec()
+        self.rect = pg.Rect(0, 0, 0, 0)
+        self.animation = Animation(self.sprite.clip)
+        self.pooled = False
+        self.reset(x, y)
 
-            if self.animationIndex == 0:
-                self.animationIndex = 1
-            else:
-                self.animationIndex = 0
+    # Puts the entity at x, y like it was just made
 
+    def reset(self, x, y):
 
-# Snakes are found above ground
-# Player cannot touch these
-# Snakes don't move
+        # Handles animation
+        # Flipped entities are drawn with the mirrored frames
 
-class Snake(pg.sprite.Sprite):
+        self.animation.play(self.sprite.clip)
+        self.flipped = False
+        self.pos.update(x, y)
+        self.changeSprite(0)
 
-    def __init__(self, x, y):
-        super().__init__()
-        self.animationTimer = 0
-        self.animationIndex = 0
-        self.animations = \
-            {'All': [pg.image.load('Sprites/Environment/Snake/1.png'),
-             pg.image.load('Sprites/Environment/Snake/2.png')]}
-        self.pos = vec(x, y)
-        self.image = self.animations['All'][0].convert_alpha()
-        self.rect = self.image.get_rect()
-        self.rect.move_ip(x, y)
+    # Changes sprite to a point of the animation playing
 
     def changeSprite(self, index=None):
+        animation = self.animation
+
         if index is None:
-            index = self.animationIndex
+            index = animation.index
 
-        self.pos = vec(self.pos.x, self.pos.y)
-        self.image = self.animations['All'][index].convert_alpha()
-        self.rect = self.image.get_rect()
-        self.rect.move_ip(self.pos.x, self.pos.y)
+        (x, y) = self.sprite.offset()
+        self.image = animation.clip.image(index, self.flipped)
+        self.rect.size = self.sprite.size(index, animation.clip)
+        self.rect.topleft = (int(self.pos.x) + x, int(self.pos.y) + y)
+
+    # Updates in main loop
 
     def update(self):
-        self.animationTimer += 1
+        if not self.animation.clip.still():
+            self.changeSprite()
 
-        self.changeSprite(self.animationIndex)
+        self.pos.x += self.sprite.speed
 
-        if self.animationTimer >= 5:
-            self.animationTimer = 0
 
-            if self.animationIndex == 0:
-                self.animationIndex = 1
-            else:
-                self.animationIndex = 0
+# Makes a new kind of entity from a SpriteDefinition, no class
+# needed:
+#
+#     Bat = define('Bat', ['Sprites/Bat/1.png', 'Sprites/Bat/2.png'],
+#                  duration=0.05, speed=-6)
 
+def define(name, paths, **options):
+    sprite = SpriteDefinition(paths, **options)
 
-# Pits are formed above ground
+    return type(name, (AnimatedSprite, ), {
+        '__slots__': (),
+        'sprite': sprite,
+        'frames': sprite.frames,
+        })
+
+
+# Barrel are found above ground
+# Player has to jump over these
+# Barrels also roll
+
+Barrel = define('Barrel', ['Sprites/Environment/Barrel/1.png',
+                'Sprites/Environment/Barrel/2.png'],
+                duration=1 / 60.0, start=1, speed=-10)
+
+# Ghost are found underground
 # Player cannot touch these
-# Pits sink and reopen
+# Ghosts also move
 
-class Pit(pg.sprite.Sprite):
+Ghost = define('Ghost', ['Sprites/Environment/Ghost/1.png',
+               'Sprites/Environment/Ghost/2.png'], duration=3 / 60.0,
+               speed=-5)
 
-    def __init__(self, x, y):
-        super().__init__()
-        self.animationTimer = 0
-        self.animationIndex = 0
-
-        # Full animation
-
-        self.animations = {'All': [
-            pg.image.load('Sprites/Environment/Pit/1.png'),
-            pg.image.load('Sprites/Environment/Pit/2.png'),
-            pg.image.load('Sprites/Environment/Pit/3.png'),
-            pg.image.load('Sprites/Environment/Pit/4.png'),
-            pg.image.load('Sprites/Environment/Pit/5.png'),
-            pg.image.load('Sprites/Environment/Pit/6.png'),
-            pg.image.load('Sprites/Environment/Pit/7.png'),
-            pg.image.load('Sprites/Environment/Pit/8.png'),
-            pg.image.load('Sprites/Environment/Pit/8.png'),
-            pg.image.load('Sprites/Environment/Pit/7.png'),
-            pg.image.load('Sprites/Environment/Pit/6.png'),
-            pg.image.load('Sprites/Environment/Pit/5.png'),
-            pg.image.load('Sprites/Environment/Pit/4.png'),
-            pg.image.load('Sprites/Environment/Pit/3.png'),
-            pg.image.load('Sprites/Environment/Pit/2.png'),
-            pg.image.load('Sprites/Environment/Pit/1.png'),
-            ]}
-        self.pos = vec(x, y)
-        self.originalPos = self.pos
-        self.image = self.animations['All'][0].convert_alpha()
-        self.rect = self.image.get_rect()
-        self.rect.move_ip(x, y)
-        self.originalWidth = self.rect.width
+# Rats are found underground
+# Player cannot touch these
+# Rats also move
 
-        # Disappearing
+Rat = define('Rat', ['Sprites/Environment/Rat/1.png',
+             'Sprites/Environment/Rat/2.png'], duration=3 / 60.0,
+             speed=-8)
 
-        self.drawing = True
-        self.disappearingTimer = 0
+# Snakes are found above ground
+# Player cannot touch these
+# Snakes don't move
 
-    def changeSprite(self, index=None):
-        if index is None:
-            index = self.animationIndex
+Snake = define('Snake', ['Sprites/Environment/Snake/1.png',
+               'Sprites/Environment/Snake/2.png'], duration=5 / 60.0)
 
-        self.pos = vec(self.pos.x, self.pos.y)
-        self.image = self.animations['All'][index].convert_alpha()
-        self.rect = self.image.get_rect()
-        self.rect.move_ip(self.pos.x, self.pos.y)
+# Walls are found below the ground
+# Player can't go through these
 
-    # Disappears for 40 intervals
+Wall = define('Wall', ['Sprites/Environment/Wall.png'])
 
-    def update(self):
-        self.animationTimer += 1
+# Ladders extend from above the ground to below the ground
+# Player can climb these
 
-        if not self.drawing:
-            self.disappearingTimer += 1
+Ladder = define('Ladder', ['Sprites/Environment/EntireLadder.png'])
 
-            if self.disappearingTimer >= 40:
-                self.drawing = True
-                self.disappearingTimer = 0
-                self.animationTimer = 0
-                self.animationIndex = 8
-        else:
-            if self.animationIndex == 7:
-                self.drawing = False
+# Coins are found above and below the ground
+# These are currency
+# (8.png has never been part of the spinning coin)
 
-            if self.animationIndex >= len(self.animations['All']) - 1:
-                self.animationIndex = 0
+Coin = define('Coin', [
+    'Sprites/Environment/Coin/1.png',
+    'Sprites/Environment/Coin/2.png',
+    'Sprites/Environment/Coin/3.png',
+    'Sprites/Environment/Coin/4.png',
+    'Sprites/Environment/Coin/5.png',
+    'Sprites/Environment/Coin/6.png',
+    'Sprites/Environment/Coin/7.png',
+    ], duration=1 / 60.0, start=1)
 
-            self.changeSprite(self.animationIndex)
-            self.pos.x = self.originalPos.x + self.originalWidth / 2 \
-                - self.rect.width / 2
 
-            if self.animationTimer >= 2:
-                self.animationTimer = 0
+# Pits are formed above ground
+# Player cannot touch these
+# Pits sink and reopen
 
-                if self.animationIndex >= len(self.animations['All']) \
-                    - 1:
-                    self.animationIndex = 0
-                else:
-                    self.animationIndex += 1
+class Pit(AnimatedSprite):
 
+    __slots__ = ('originalPos', 'originalWidth', 'drawing')
 
-# Walls are found below the ground
-# Player can't go through these
+    # Opens, every frame is shown for 2 steps
 
-class Wall(pg.sprite.Sprite):
+    sprite = SpriteDefinition([
+        'Sprites/Environment/Pit/1.png',
+        'Sprites/Environment/Pit/2.png',
+        'Sprites/Environment/Pit/3.png',
+        'Sprites/Environment/Pit/4.png',
+        'Sprites/Environment/Pit/5.png',
+        'Sprites/Environment/Pit/6.png',
+        'Sprites/Environment/Pit/7.png',
+        'Sprites/Environment/Pit/8.png',
+        ], duration=2 / 60.0, mode=ONCE, order=range(7))
+    frames = sprite.frames
 
-    def __init__(self, x, y):
-        super().__init__()
-        self.animations = \
-            {'All': [pg.image.load('Sprites/Environment/Wall.png')]}
-        self.pos = vec(x, y)
-        self.image = self.animations['All'][0].convert_alpha()
-        self.rect = self.image.get_rect()
-        self.rect.move_ip(x, y)
+    # Disappears for 40 steps once it's wide open
 
+    gone = Clip(frames, 40 / 60.0, ONCE, [7])
 
-# Ladders extend from above the ground to below the ground
-# Player can climb these
+    # Comes back wide open and closes
 
-class Ladder(pg.sprite.Sprite):
+    closing = Clip(frames, [3 / 60.0] + [2 / 60.0] * 6, ONCE, [
+        7,
+        6,
+        5,
+        4,
+        3,
+        2,
+        1,
+        ])
 
     def __init__(self, x, y):
-        super().__init__()
-        self.animations = \
-            {'All': [pg.image.load('Sprites/Environment/EntireLadder.png'
-             )]}
-        self.pos = vec(x, y)
-        self.image = self.animations['All'][0].convert_alpha()
-        self.rect = self.image.get_rect()
-        self.rect.move_ip(x, y)
+        self.originalPos = vec()
+        super().__init__(x, y)
+        self.animation.ended = self.nextClip
 
+    def reset(self, x, y):
+        super().reset(x, y)
+        self.originalPos.update(x, y)
+        self.originalWidth = self.rect.width
 
-# Coins are found above and below the ground
-# These are currency
+        # Disappearing
 
-class Coin(pg.sprite.Sprite):
+        self.drawing = True
 
-    def __init__(self, x, y):
-        super().__init__()
-        self.animationTimer = 0
-        self.animationIndex = 0
-        self.animations = {'All': [
-            pg.image.load('Sprites/Environment/Coin/1.png'),
-            pg.image.load('Sprites/Environment/Coin/2.png'),
-            pg.image.load('Sprites/Environment/Coin/3.png'),
-            pg.image.load('Sprites/Environment/Coin/4.png'),
-            pg.image.load('Sprites/Environment/Coin/5.png'),
-            pg.image.load('Sprites/Environment/Coin/6.png'),
-            pg.image.load('Sprites/Environment/Coin/7.png'),
-            pg.image.load('Sprites/Environment/Coin/8.png'),
-            ]}
-        self.pos = vec(x, y)
-        self.image = self.animations['All'][0].convert_alpha()
-        self.rect = self.image.get_rect()
-        self.rect.move_ip(x, y)
+    # Opening, gone and closing take turns
 
-    def changeSprite(self, index=None):
-        if index is None:
-            index = self.animationIndex
+    def nextClip(self, animation):
+        if animation.clip is self.sprite.clip:
+            self.drawing = False
+            animation.chain(self.gone)
+        elif animation.clip is self.gone:
+            self.drawing = True
+            animation.chain(self.closing)
+        else:
+            animation.chain(self.sprite.clip)
 
-        self.image = self.animations['All'][index].convert_alpha()
-        self.rect = self.image.get_rect()
-        self.rect.move_ip(self.pos.x, self.pos.y)
+    # Stays in the middle of where it was made as it changes size
 
     def update(self):
-        self.animationIndex += 1
-
-        if self.animationIndex >= len(self.animations['All']) - 1:
-            self.animationIndex = 0
+        self.changeSprite()
+        self.pos.x = self.originalPos.x + self.originalWidth / 2 \
+            - self.rect.width / 2
 
-        self.changeSprite(self.animationIndex)
 
-        if self.animationTimer >= 2:
-            self.animationTimer = 0
+# Every kind of entity has a pool
 
-            if self.animationIndex >= len(self.animations['All']) - 1:
-                self.animationIndex = 0
-            else:
-                self.animationIndex += 1
+pools = [Pool(kind) for kind in (Barrel, Ghost, Rat, Snake, Pit, Wall,
+         Ladder, Coin)]
 
 
+# What every pool has been up to: {kind name: stats}
 
-			
\ No newline at end of file
+def poolStats():
+    return dict((pool.kind.__name__, pool.stats()) for pool in pools)
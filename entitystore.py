@@ -0,0 +1,270 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Pitfall v1.0
+By Danilo Lekovic for Game Design 12
+
+entitystore.py
+
+Keeps the simple animated entities (barrels, ghosts, rats, snakes
+and coins) in NumPy arrays, one row per entity, so moving,
+animating and hit testing all of them is a handful of array
+operations instead of a Python call per entity. Turned on with
+--entity-store, needs NumPy
+"""
+
+from entity import *
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Whether the store can be used at all
+
+available = np is not None
+
+# Kinds kept in the store, how they move and animate comes from
+# their SpriteDefinition (anything with its own update() can't go
+# in, like pits, and neither can ONCE animations)
+
+KINDS = [Barrel, Ghost, Rat, Snake, Coin]
+
+# Movement further than this between two steps isn't smoothed
+# (the same as Play.smooth)
+
+SNAP = 64
+
+
+# Entity store
+# Entities stay the objects they are (they are what goes in the
+# level list and back to the pools), but while they are in the
+# store their position, animation and rect live in the arrays and
+# the objects are only brought up to date by sync() or when they
+# are taken out
+
+class EntityStore:
+
+    def __init__(self, capacity=64):
+        sprites = [kind.sprite for kind in KINDS]
+        self.kinds = dict((kind, i) for (i, kind) in enumerate(KINDS))
+        self.speeds = np.array([sprite.speed for sprite in sprites],
+                               dtype=np.float64)
+        self.periods = np.array([sprite.clip.durations[0] or 0.0
+                                for sprite in sprites], dtype=np.float64)
+        self.cycles = np.array([len(sprite.clip) for sprite in sprites],
+                               dtype=np.int32)
+        self.offsets = np.array([sprite.offset() for sprite in sprites],
+                                dtype=np.int32)
+
+        # Frames and rect sizes at every point of every kind's
+        # animation: frames[kind][index] and sizes[kind, index] =
+        # (width, height)
+
+        for kind in KINDS:
+            kind.frames.load()
+
+        longest = max(len(sprite.clip) for sprite in sprites)
+        self.frames = [[sprite.frames[i] for i in sprite.clip.sequence]
+                       for sprite in sprites]
+        self.sizes = np.zeros((len(sprites), longest, 2), dtype=np.int32)
+
+        for (i, sprite) in enumerate(sprites):
+            self.sizes[i, :len(sprite.clip)] = [sprite.size(index)
+                    for index in range(len(sprite.clip))]
+
+        self.elements = []
+        self.rows = {}
+        self.count = 0
+        self.allocate(capacity)
+
+    # Makes room for capacity rows, keeping the ones there are
+
+    def allocate(self, capacity):
+        old = getattr(self, 'x', None)
+        columns = [
+            ('kind', np.int32),
+            ('x', np.float64),
+            ('y', np.float64),
+            ('previousX', np.float64),
+            ('speed', np.float64),
+            ('index', np.int32),
+            ('shown', np.int32),
+            ('time', np.float64),
+            ('period', np.float64),
+            ('cycle', np.int32),
+            ('left', np.int32),
+            ('top', np.int32),
+            ('width', np.int32),
+            ('height', np.int32),
+            ]
+
+        for (name, kind) in columns:
+            column = np.zeros(capacity, dtype=kind)
+
+            if old is not None:
+                column[:self.count] = getattr(self, name)[:self.count]
+
+            setattr(self, name, column)
+
+        self.capacity = capacity
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, element):
+        return element in self.rows
+
+    # Whether an element of this kind can go in the store
+
+    def holds(self, element):
+        return type(element) in self.kinds
+
+    def add(self, element):
+        if self.count == self.capacity:
+            self.allocate(self.capacity * 2)
+
+        row = self.count
+        kind = self.kinds[type(element)]
+        self.kind[row] = kind
+        self.x[row] = self.previousX[row] = element.pos.x
+        self.y[row] = element.pos.y
+        self.speed[row] = self.speeds[kind]
+        self.index[row] = element.animation.index
+
+        # Entities come in fresh from their pool, showing their first
+        # frame until their first step
+
+        self.shown[row] = 0
+        self.time[row] = element.animation.time
+        self.period[row] = self.periods[kind]
+        self.cycle[row] = self.cycles[kind]
+        (self.left[row], self.top[row], self.width[row],
+         self.height[row]) = element.rect
+
+        self.elements.append(element)
+        self.rows[element] = row
+        self.count += 1
+
+    # Takes an element out, it gets its position and animation back
+    # The rows after it move up one so everything stays in the order
+    # it was added (the order of the level, which is the order
+    # entities are drawn and hit in)
+
+    def remove(self, element):
+        row = self.rows.pop(element)
+        self.write(element, row)
+        n = self.count
+
+        for column in self.columns():
+            column[row:n - 1] = column[row + 1:n]
+
+        del self.elements[row]
+
+        for moved in self.elements[row:]:
+            self.rows[moved] -= 1
+
+        self.count -= 1
+
+    def clear(self):
+        self.elements = []
+        self.rows.clear()
+        self.count = 0
+
+    def columns(self):
+        return [self.kind, self.x, self.y, self.previousX, self.speed,
+                self.index, self.shown, self.time, self.period,
+                self.cycle, self.left, self.top, self.width, self.height]
+
+    # Runs one step (dt seconds) for every entity in the store
+
+    def step(self, dt):
+        n = self.count
+
+        if n == 0:
+            return
+
+        x = self.x[:n]
+        index = self.index[:n]
+        time = self.time[:n]
+        period = self.period[:n]
+        cycle = self.cycle[:n]
+        self.previousX[:n] = x
+
+        # Shows the frame it's at, then moves the animation on the
+        # way Animation.step does (a long step can skip frames)
+
+        self.shown[:n] = index
+        animated = period > 0
+        time += np.where(animated, dt, 0.0)
+        frames = np.zeros(n, dtype=np.int32)
+        np.floor_divide(time + EPSILON, period, out=frames,
+                        where=animated, casting='unsafe')
+        time -= frames * period
+        index += frames
+        index %= cycle
+
+        # The rect is where the entity was before it moved
+
+        kind = self.kind[:n]
+        sizes = self.sizes[kind, self.shown[:n]]
+        offsets = self.offsets[kind]
+        self.left[:n] = x.astype(np.int32) + offsets[:, 0]
+        self.top[:n] = self.y[:n].astype(np.int32) + offsets[:, 1]
+        self.width[:n] = sizes[:, 0]
+        self.height[:n] = sizes[:, 1]
+        x += self.speed[:n]
+
+    # Entities whose rect overlaps rect
+
+    def touching(self, rect):
+        n = self.count
+
+        if n == 0:
+            return []
+
+        left = self.left[:n]
+        top = self.top[:n]
+        hits = (left < rect.right) & (left + self.width[:n] > rect.left) \
+            & (top < rect.bottom) & (top + self.height[:n] > rect.top)
+
+        return [self.elements[row] for row in np.flatnonzero(hits)]
+
+    # Draws every entity, smoothed between its last two positions
+    # like Play.smooth does. Returns the rects drawn to
+
+    def draw(self, screen, alpha=1.0):
+        n = self.count
+
+        if n == 0:
+            return []
+
+        x = self.x[:n]
+        previous = self.previousX[:n]
+        smoothed = np.where(np.abs(x - previous) > SNAP, x, previous
+                            + (x - previous) * alpha)
+        frames = self.frames
+        images = [frames[kind][shown] for (kind, shown) in
+                  zip(self.kind[:n].tolist(), self.shown[:n].tolist())]
+
+        return screen.blits(zip(images, zip(smoothed.tolist(),
+                            self.y[:n].tolist())))
+
+    # Writes a row back into its entity
+
+    def write(self, element, row):
+        kind = self.kind[row]
+        shown = int(self.shown[row])
+        element.pos.update(float(self.x[row]), float(self.y[row]))
+        element.animation.index = int(self.index[row])
+        element.animation.time = float(self.time[row])
+        element.image = self.frames[kind][shown]
+        element.rect.update(int(self.left[row]), int(self.top[row]),
+                            int(self.width[row]), int(self.height[row]))
+
+    # Brings every entity in the store up to date
+
+    def sync(self):
+        for (row, element) in enumerate(self.elements):
+            self.write(element, row)
@@ -10,44 +10,324 @@ filemanager.py
 File manager for opening, reading, editing saved games
 """
 
-# We are using Python's built-in JSON support
-# because it is very easy to access with minimal code
-import json
+# Saves used to be JSON, they are a small binary format now
+# (see savefile.py). Old saves are converted the first time
+# they are loaded
+import os
+import sys
+import time
+import atexit
+import shutil
+import threading
+import savefile
+from contextlib import contextmanager
 
 
+# Writes a save file
+# The new save goes into a temporary file first and then
+# replaces the old one, so a crash can't leave half a save
+
+def writeSave(path, data):
+    temporary = path + '.tmp'
+
+    with open(temporary, 'wb') as outfile:
+        outfile.write(savefile.encode(data))
+        outfile.flush()
+        os.fsync(outfile.fileno())
+
+    # The new file keeps the old one's permissions
+
+    if os.path.exists(path):
+        os.chmod(temporary, os.stat(path).st_mode)
+
+    os.replace(temporary, path)
+
+
+# Background save writer
+# Saves are handed over to a thread that does the writing, so the
+# game never waits on the disk. A save waits interval seconds
+# before it's written; anything saved in the meantime replaces it
+# (only the newest value of every key ends up being written)
+
+class SaveWriter:
+
+    def __init__(self, path, interval=1.0):
+        self.path = path
+        self.interval = interval
+        self.condition = threading.Condition()
+        self.pending = None
+        self.writing = False
+        self.urgent = False
+        self.stopping = False
+        self.error = None
+
+        # Statistics
+
+        self.writes = 0
+        self.coalesced = 0
+
+        self.thread = threading.Thread(target=self.run,
+                                       name='SaveWriter', daemon=True)
+        self.thread.start()
+
+    # Queues a save, data must not be changed afterwards
+
+    def submit(self, data):
+        with self.condition:
+            if self.pending is not None:
+                self.coalesced += 1
+
+            self.pending = data
+            self.condition.notify_all()
+
+    # Writes whatever is queued now and waits until it's on disk
+    # Returns False if it took longer than timeout
+
+    def sync(self, timeout=None):
+        deadline = (None if timeout is None else time.monotonic()
+                    + timeout)
+
+        with self.condition:
+            self.urgent = True
+            self.condition.notify_all()
+
+            while self.pending is not None or self.writing:
+                if deadline is None:
+                    self.condition.wait()
+                elif not self.condition.wait(max(0.0, deadline
+                        - time.monotonic())):
+                    return False
+
+            error = self.error
+            self.error = None
+
+        if error is not None:
+            raise error
+
+        return True
+
+    # Writes what's left and ends the thread
+
+    def stop(self):
+        with self.condition:
+            self.stopping = True
+            self.condition.notify_all()
+
+        self.thread.join()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.pending is None and not self.stopping:
+                    self.condition.wait()
+
+                if self.pending is None:
+                    return
+
+                # Gives other saves a chance to come in first
+
+                deadline = time.monotonic() + self.interval
+
+                while not self.urgent and not self.stopping:
+                    remaining = deadline - time.monotonic()
+
+                    if remaining <= 0:
+                        break
+
+                    self.condition.wait(remaining)
+
+                data = self.pending
+                self.pending = None
+                self.urgent = False
+                self.writing = True
+
+            try:
+                writeSave(self.path, data)
+                error = None
+            except Exception as e:
+                error = e
+                print('Could not save the game: {}'.format(e),
+                      file=sys.stderr)
+
+            with self.condition:
+                self.writing = False
+                self.writes += 1
+                self.error = error
+                self.condition.notify_all()
+
+
+# The save file is read once and kept in memory. Reading an option
+# is a dictionary lookup and edits are written back to the file
+# with a single atomic write (temporary file + rename).
+#
+# Edits made inside a batch are written once, when the batch ends:
+#
+#     with FileManager.batch():
+#         FileManager.edit('Coins', 10)
+#         FileManager.edit('High Score', 500)
+#
+# After startWriter() the writing is done by a SaveWriter in the
+# background and sync() waits until everything is on disk
+
 class FileManager:
 
-    # Looks for key and returns value
+    # Save game file is save.pitfall
 
-    def readOption(option):
-        jsonElements = None
+    path = 'save.pitfall'
+
+    # What's in the save file, loaded the first time it's needed
 
-        # Save game file is save.pitfall
+    data = None
 
-        with open('save.pitfall', 'r') as f:
-            output = f.read()
+    # Whether data has changes that aren't in the file yet
 
-            jsonElements = json.loads(output)
+    dirty = False
 
-        return jsonElements[option]
+    # How many batches we are inside of
+
+    depth = 0
+
+    # Number of times the file was written, handy for debugging
+
+    writes = 0
+
+    # Background writer, if there is one
+
+    writer = None
+
+    # Reads the save file into memory (only once)
+
+    def load():
+        if FileManager.data is None:
+            FileManager.data = FileManager.read(FileManager.path)
+
+        return FileManager.data
+
+    # Reads a save file of any kind
+    # A missing or empty save is a new one, an old JSON save is
+    # converted and a broken one is kept next to the new save (as
+    # .bad) in case somebody wants to look at it
+
+    def read(path):
+        data = b''
+
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                data = f.read()
+
+        try:
+            values = savefile.load(data)
+        except savefile.SaveError as e:
+            print('Save file is broken ({}), starting over'.format(e),
+                  file=sys.stderr)
+            shutil.copyfile(path, path + '.bad')
+            values = savefile.defaults()
+            data = b''
+
+        if not savefile.isBinary(data):
+            FileManager.data = values
+            FileManager.dirty = True
+            FileManager.flush()
+
+        return values
+
+    # Forgets what's in memory, the file is read again next time
+
+    def reload():
+        FileManager.data = None
+        FileManager.dirty = False
+
+    # Looks for key and returns value
+
+    def readOption(option):
+        return FileManager.load()[option]
 
     # Edits key with value
+    # Outside of a batch the change is saved straight away
 
     def edit(option, value):
-        jsonElements = None
+        jsonElements = FileManager.load()
 
-        # Read file first
+        if option not in savefile.NAMES:
+            raise KeyError(option)
 
-        with open('save.pitfall', 'r') as f:
-            output = f.read()
+        # Nothing to do if the value is the same
 
-            jsonElements = json.loads(output)
-
-        # Make changes
+        if option in jsonElements and jsonElements[option] == value:
+            return
 
         jsonElements[option] = value
+        FileManager.dirty = True
+
+        if FileManager.depth == 0:
+            FileManager.flush()
+
+    # Groups edits into one write
+    # If something goes wrong inside the batch none of its edits
+    # are kept. Batches can be nested, the outermost one writes
+
+    @contextmanager
+    def batch():
+        if FileManager.depth == 0:
+            before = dict(FileManager.load())
+            wasDirty = FileManager.dirty
+
+        FileManager.depth += 1
+
+        try:
+            yield FileManager.data
+        except BaseException:
+            if FileManager.depth == 1:
+                FileManager.data = before
+                FileManager.dirty = wasDirty
+
+            raise
+        finally:
+            FileManager.depth -= 1
+
+        if FileManager.depth == 0:
+            FileManager.flush()
+
+    # Saves the changes, if there are any
+    # With a background writer this only queues them
+
+    def flush():
+        if not FileManager.dirty:
+            return
+
+        if FileManager.writer is not None:
+            FileManager.writer.submit(dict(FileManager.data))
+        else:
+            writeSave(FileManager.path, FileManager.data)
+            FileManager.writes += 1
+
+        FileManager.dirty = False
+
+    # Makes sure every change is on disk before returning
+
+    def sync(timeout=None):
+        FileManager.flush()
+
+        if FileManager.writer is not None:
+            return FileManager.writer.sync(timeout)
+
+        return True
+
+    # Moves saving to a background thread
+    # interval is how long a save may wait to be written
+
+    def startWriter(interval=1.0):
+        if FileManager.writer is None:
+            FileManager.writer = SaveWriter(FileManager.path, interval)
+
+            # Nothing is lost if the game crashes
+
+            atexit.register(FileManager.stopWriter)
 
-        # Save changes
+    # Writes everything that's left and stops the background thread
 
-        with open('save.pitfall', 'w') as outfile:
-            json.dump(jsonElements, outfile)
\ No newline at end of file
+    def stopWriter():
+        if FileManager.writer is not None:
+            FileManager.flush()
+            FileManager.writer.stop()
+            FileManager.writer = None
@@ -10,16 +10,22 @@ game.py
 Main execution file
 """
 
+import argparse
 import pygame
 from pygame.locals import *
 from screen import *
+from assets import sounds
+from profiler import profiler
+from levelbank import levelBank
+import entitystore
+from filemanager import FileManager
 
 
 class Game:
 
     # Initialize class
 
-    def __init__(self):
+    def __init__(self, timeScale=1.0, maxFrameSkip=5, screens=4):
 
         # Class variables
 
@@ -28,26 +34,51 @@ class Game:
         self.height = 720
         self.playing = True
 
+        # The game always moves in steps of the same length, no matter
+        # how fast frames are drawn. A slow frame is caught up with
+        # extra steps, but never more than maxFrameSkip of them
+        # (timeScale speeds the game up or slows it down)
+
+        self.step = 1.0 / self.FPS
+        self.timeScale = timeScale
+        self.maxFrameSkip = maxFrameSkip
+        self.accumulator = 0.0
+        self.elapsed = self.step
+
         # Initialize sound system
 
         pygame.mixer.pre_init(44100, 16, 2, 4096)
         pygame.mixer.init(frequency=44100, size=-16, channels=1,
                           buffer=2 ** 12)
 
+        # Sound effects are decoded once, here, and shared by every
+        # screen
+
+        sounds.preload(EFFECTS)
+
         # Pygame initialization
 
         pygame.init()
         self.clock = pygame.time.Clock()
         self.screen = pygame.display.set_mode((self.width, self.height))
 
+        # Saving happens in the background so a slow disk
+        # never holds up a frame
+
+        FileManager.startWriter()
+
         # Initialize screen manager for switching screens
+        # Screens are kept once they're made, but no more than
+        # screens of them
 
-        self.screenManager = ScreenManager()
-        self.screenManager.set(MainMenu(self.screenManager))
+        self.screenManager = ScreenManager(screens)
+        self.screenManager.show(MainMenu)
 
     # Game loop
 
     def loop(self):
+        profiler.begin()
+
         for event in pygame.event.get():
 
             # Quit game
@@ -55,27 +86,73 @@ class Game:
             if event.type is pygame.QUIT:
                 self.playing = False
 
-                # Save game
+                # Save game and wait until it's on disk
 
                 self.screenManager.saveAll()
+                FileManager.sync()
+
+            # F3 shows frame timings
+
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                profiler.toggleOverlay()
+                self.screenManager.get().invalidate()
 
             # Handle screen events
 
             self.screenManager.get().keyDownEvent(event)
             self.screenManager.get().mouseClickEvent(event)
 
+        profiler.mark('events')
+
+        # Run the game for however many steps fit in the time
+        # that passed since the last frame
+
+        self.accumulator += self.elapsed * self.timeScale
+        maxSteps = int(self.maxFrameSkip * max(1.0, self.timeScale))
+        steps = 0
+
+        while self.accumulator >= self.step and steps < maxSteps:
+            self.screenManager.get().update(self.step)
+            self.accumulator -= self.step
+            steps += 1
+
+        # Too far behind to catch up, so the game just slows down
+
+        if self.accumulator >= self.step:
+            self.accumulator %= self.step
+
         # Run drawing function for screen
+        # alpha is how far we are between the last step and the next
+        # Screens can return the parts of the screen they changed
 
-        self.screenManager.get().draw(self.screen)
+        alpha = self.accumulator / self.step
+        changed = self.screenManager.get().draw(self.screen, alpha)
+        overlay = profiler.drawOverlay(self.screen)
+
+        if changed is not None and overlay is not None:
+            changed.append(overlay)
+
+        profiler.mark('draw')
 
         # Update screen
 
-        pygame.display.update()
-        self.clock.tick(self.FPS)
+        if changed is None:
+            pygame.display.update()
+        else:
+            pygame.display.update(changed)
+
+        profiler.mark('display')
+
+        self.elapsed = self.clock.tick(self.FPS) / 1000.0
+
+        profiler.mark('tick')
+        profiler.end()
 
     # Handle quit
 
     def quit(self):
+        FileManager.stopWriter()
+        profiler.close()
         pygame.quit()
 
     # Gets current screen
@@ -84,7 +161,39 @@ class Game:
         return self.screen
 
 
-game = Game()
+# Command line options
+
+parser = argparse.ArgumentParser(description='Pitfall')
+parser.add_argument('--dirty-rects', action='store_true',
+                    help='only redraw the parts of the screen that change')
+parser.add_argument('--time-scale', type=float, default=1.0,
+                    help='game speed, 2 is twice as fast')
+parser.add_argument('--max-frame-skip', type=int, default=5,
+                    help='most game steps run to catch up on a slow frame')
+parser.add_argument('--screens', type=int, default=4,
+                    help='most screens kept around to be shown again')
+parser.add_argument('--profile-csv', metavar='FILE',
+                    help='write the time of every part of every frame')
+parser.add_argument('--level-bank', metavar='FILE', default=levelBank.path,
+                    help='pick levels from this bank (see levelbank.py)')
+parser.add_argument('--random-levels', action='store_true',
+                    help='make every level up on the spot instead')
+parser.add_argument('--entity-store', action='store_true',
+                    help='move and animate entities with NumPy arrays')
+options = parser.parse_args()
+
+Play.dirtyRendering = options.dirty_rects
+Play.useLevelBank = not options.random_levels
+Play.useEntityStore = options.entity_store
+
+if options.entity_store and not entitystore.available:
+    print('NumPy is not installed, --entity-store does nothing')
+levelBank.use(options.level_bank)
+
+if options.profile_csv:
+    profiler.openCsv(options.profile_csv)
+
+game = Game(options.time_scale, options.max_frame_skip, options.screens)
 
 while game.playing:
     game.loop()
@@ -0,0 +1,207 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Pitfall v1.0
+By Danilo Lekovic for Game Design 12
+
+glyphfont.py
+
+Bitmap font made from Pitfall.ttf. Every letter is drawn once into
+a glyph sheet and text is put together by blitting those letters
+"""
+
+import pygame
+from collections import OrderedDict
+
+# Letters that go into the glyph sheet straight away
+
+CHARACTERS = ''.join(chr(i) for i in range(32, 127))
+
+
+class GlyphFont:
+
+    # Initialize class
+    # Works like pygame.font.Font so it can be used in its place
+
+    def __init__(self, path, size, cacheSize=64):
+        self.font = pygame.font.Font(path, size)
+        self.height = self.font.get_height()
+
+        # One glyph sheet per (antialias, colour)
+
+        self.sheets = {}
+
+        # Widths of single letters and pairs of letters
+        # (pairs take kerning into account)
+
+        self.advances = {}
+        self.pairs = {}
+
+        # Most recently rendered strings
+
+        self.cacheSize = cacheSize
+        self.rendered = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    # Same as pygame.font.Font.render
+    # The surface is shared, don't draw on it!
+
+    def render(self, text, antialias, color, background=None):
+        key = (text, antialias, color, background)
+
+        try:
+            surface = self.rendered.get(key)
+        except TypeError:
+
+            # Colours given as lists can't be used as keys
+
+            color = tuple(color)
+
+            if background is not None:
+                background = tuple(background)
+
+            key = (text, antialias, color, background)
+            surface = self.rendered.get(key)
+
+        if surface is not None:
+            self.hits += 1
+            return surface
+
+        self.misses += 1
+        surface = self.compose(str(text), antialias, color, background)
+        self.rendered[key] = surface
+
+        if len(self.rendered) > self.cacheSize:
+            self.rendered.popitem(last=False)
+
+        return surface
+
+    # Builds a string out of the glyph sheet
+
+    def compose(self, text, antialias, color, background):
+        glyphs = self.sheet(antialias, color)
+        surface = pygame.Surface((max(self.size(text)[0], 1),
+                                 self.height), pygame.SRCALPHA, 32)
+
+        if background is not None:
+            surface.fill(background)
+            flags = 0
+        else:
+
+            # Letters are copied as they are onto the clear surface,
+            # blending them would darken the antialiased edges
+
+            flags = pygame.BLEND_RGBA_MAX
+
+        x = 0
+
+        for (i, letter) in enumerate(text):
+            glyph = glyphs.get(letter)
+
+            if glyph is None:
+                glyph = self.glyph(letter, antialias, color)
+                glyphs[letter] = glyph
+
+            surface.blit(glyph, (x, 0), special_flags=flags)
+
+            if i + 1 < len(text):
+                x += self.advance(letter, text[i + 1])
+
+        return surface
+
+    # Width and height of text, like pygame.font.Font.size
+
+    def size(self, text):
+        width = 0
+
+        for (i, letter) in enumerate(text):
+            if i + 1 < len(text):
+                width += self.advance(letter, text[i + 1])
+            else:
+                width += self.width(letter)
+
+        return (width, self.height)
+
+    # How far the pen moves from letter to the next one
+
+    def advance(self, letter, following):
+        pair = letter + following
+        advance = self.pairs.get(pair)
+
+        if advance is None:
+            advance = self.font.size(pair)[0] - self.width(following)
+            self.pairs[pair] = advance
+
+        return advance
+
+    # Width of a single letter
+
+    def width(self, letter):
+        width = self.advances.get(letter)
+
+        if width is None:
+            width = self.font.size(letter)[0]
+            self.advances[letter] = width
+
+        return width
+
+    def get_height(self):
+        return self.height
+
+    def get_linesize(self):
+        return self.font.get_linesize()
+
+    # Rasterises a single letter
+
+    def glyph(self, letter, antialias, color):
+        glyph = self.font.render(letter, antialias, color)
+
+        if pygame.display.get_surface() is not None:
+            glyph = glyph.convert_alpha()
+
+        return glyph
+
+    # Draws every letter in CHARACTERS into one sheet for this colour
+    # and returns {letter: subsurface of the sheet}
+
+    def sheet(self, antialias, color):
+        key = (bool(antialias), tuple(color))
+        glyphs = self.sheets.get(key)
+
+        if glyphs is not None:
+            return glyphs
+
+        rendered = [(letter, self.glyph(letter, antialias, color))
+                    for letter in CHARACTERS]
+        width = sum(glyph.get_width() for (letter, glyph) in rendered)
+        height = max(glyph.get_height() for (letter, glyph) in rendered)
+        sheet = pygame.Surface((width, height), pygame.SRCALPHA, 32)
+        glyphs = {}
+        x = 0
+
+        for (letter, glyph) in rendered:
+            sheet.blit(glyph, (x, 0), special_flags=pygame.BLEND_RGBA_MAX)
+            glyphs[letter] = sheet.subsurface((x, 0, glyph.get_width(),
+                    glyph.get_height()))
+            x += glyph.get_width()
+
+        self.sheets[key] = glyphs
+
+        return glyphs
+
+
+# Every font size is only made once for the whole game
+
+fonts = {}
+
+
+def getFont(path, size):
+    font = fonts.get((path, size))
+
+    if font is None:
+        font = GlyphFont(path, size)
+        fonts[(path, size)] = font
+
+    return font
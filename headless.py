@@ -0,0 +1,272 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Pitfall v1.0
+By Danilo Lekovic for Game Design 12
+
+headless.py
+
+Runs the game with no window, no sound and no frame rate cap, as
+fast as the computer can go. Good for soak testing:
+
+    python headless.py --frames 100000
+    python headless.py --seconds 30 --draw
+    python headless.py --script moves.json
+
+A script is a list of [frame, "down" or "up", key name], e.g.
+[[0, "down", "right"], [40, "down", "space"]]
+"""
+
+import os
+
+# No window and no sound card needed
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import argparse
+import json
+import random
+import time
+import pygame
+from collections import Counter
+from screen import *
+from entity import poolStats
+from assets import sounds
+
+# Keys the random player presses, right is pressed a lot more
+# so the player actually gets somewhere
+
+KEYS = [pygame.K_RIGHT] * 6 + [pygame.K_LEFT, pygame.K_SPACE,
+                               pygame.K_SPACE, pygame.K_UP,
+                               pygame.K_DOWN, pygame.K_q, pygame.K_e]
+
+
+# Makes random key presses, about one every ten frames
+
+class RandomInput:
+
+    def __init__(self, seed):
+        self.random = random.Random(seed)
+        self.held = None
+
+    def events(self, frame):
+        if self.random.random() > 0.1:
+            return []
+
+        events = []
+
+        if self.held is not None:
+            events.append(pygame.event.Event(pygame.KEYUP,
+                          key=self.held))
+            self.held = None
+
+        key = self.random.choice(KEYS)
+        events.append(pygame.event.Event(pygame.KEYDOWN, key=key))
+
+        if key in (pygame.K_RIGHT, pygame.K_LEFT):
+            self.held = key
+
+        return events
+
+
+# Plays back key presses from a script file
+
+class ScriptedInput:
+
+    def __init__(self, path):
+        with open(path, 'r') as f:
+            script = json.load(f)
+
+        self.script = {}
+
+        for (frame, kind, name) in script:
+            kind = (pygame.KEYDOWN if kind == 'down' else pygame.KEYUP)
+            event = pygame.event.Event(kind,
+                                       key=pygame.key.key_code(name))
+            self.script.setdefault(frame, []).append(event)
+
+    def events(self, frame):
+        return self.script.get(frame, [])
+
+
+# Runs Play until we run out of frames or time
+# A new game is started every time the player dies
+
+def run(source, frames=None, seconds=None, draw=False,
+        immortal=False):
+    screen = pygame.display.get_surface()
+    screenManager = ScreenManager()
+    play = screenManager.show(Play)
+    level = play.level
+
+    step = 1.0 / 60
+    stats = {
+        'frames': 0,
+        'levels': 1,
+        'deaths': 0,
+        'entities': 0,
+        'types': Counter(),
+        'unplaced': len(play.unplaced),
+        'transitions': [],
+        'stepTime': 0.0,
+        }
+    start = time.perf_counter()
+
+    while True:
+        if frames is not None and stats['frames'] >= frames:
+            break
+
+        if seconds is not None and time.perf_counter() - start \
+            >= seconds:
+            break
+
+        for event in source.events(stats['frames']):
+            play.keyDownEvent(event)
+
+        if immortal:
+            play.player.health = max(play.player.health, 2)
+
+        began = time.perf_counter()
+        play.update(step)
+        transition = False
+
+        # Dead, so it's a new game (on the same Play)
+
+        if screenManager.get() is not play:
+            stats['deaths'] += 1
+            stats['levels'] += 1
+            screenManager.show(Play)
+            level = play.level
+            stats['unplaced'] += len(play.unplaced)
+
+        # A new level means a new level list
+
+        if play.level is not level:
+            stats['levels'] += 1
+            stats['unplaced'] += len(play.unplaced)
+            level = play.level
+            transition = True
+
+        if draw:
+            play.draw(screen)
+
+        # How long moving on to the next level takes compared to
+        # any other step
+
+        took = time.perf_counter() - began
+
+        if transition:
+            stats['transitions'].append(took)
+        else:
+            stats['stepTime'] += took
+
+        stats['frames'] += 1
+        stats['entities'] += len(play.level)
+        stats['types'].update(type(element).__name__ for element in
+                              play.level)
+
+    stats['seconds'] = time.perf_counter() - start
+    stats['pools'] = poolStats()
+    stats['sounds'] = sounds.stats()
+
+    return stats
+
+
+# Prints what happened during a run
+
+def report(stats):
+    frames = max(stats['frames'], 1)
+    seconds = max(stats['seconds'], 1e-09)
+
+    print('Frames:   {}'.format(stats['frames']))
+    print('Time:     {:.2f} s'.format(stats['seconds']))
+    print('Speed:    {:.0f} frames/s'.format(stats['frames'] / seconds))
+    print('Levels:   {}'.format(stats['levels']))
+    print('Deaths:   {}'.format(stats['deaths']))
+    print('Unplaced: {}'.format(stats['unplaced']))
+
+    transitions = stats['transitions']
+
+    if transitions:
+        steps = max(stats['frames'] - len(transitions), 1)
+        print('Transition: {:.3f} ms mean, {:.3f} ms max (other steps '
+              '{:.3f} ms)'.format(1000.0 * sum(transitions)
+              / len(transitions), 1000.0 * max(transitions), 1000.0
+              * stats['stepTime'] / steps))
+
+    print('Entities: {:.1f} per frame'.format(stats['entities']
+          / frames))
+
+    for (name, count) in sorted(stats['types'].items()):
+        print('  {:<8} {:.2f}'.format(name, count / frames))
+
+    print('Sounds:   {} loaded {} times, {} played'.format(
+          stats['sounds']['sounds'], stats['sounds']['loads'],
+          stats['sounds']['plays']))
+    print('Pools:')
+
+    for (name, pool) in sorted(stats['pools'].items()):
+        print('  {:<8} {} made, {} reused, {} free'.format(name,
+              pool['created'], pool['reused'], pool['free']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pitfall with no window')
+    parser.add_argument('--frames', type=int,
+                        help='stop after this many frames')
+    parser.add_argument('--seconds', type=float,
+                        help='stop after this many seconds')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='seed for levels and random input')
+    parser.add_argument('--script', help='play key presses from a file')
+    parser.add_argument('--draw', action='store_true',
+                        help='draw every frame too')
+    parser.add_argument('--immortal', action='store_true',
+                        help='the player never dies')
+    parser.add_argument('--no-prepare', action='store_true',
+                        help='make every level when it is reached')
+    parser.add_argument('--random-levels', action='store_true',
+                        help="don't use the level bank")
+    parser.add_argument('--entity-store', action='store_true',
+                        help='move and animate entities with NumPy arrays')
+    options = parser.parse_args()
+
+    Play.prepareLevels = not options.no_prepare
+    Play.useLevelBank = not options.random_levels
+    Play.useEntityStore = options.entity_store
+
+    if options.frames is None and options.seconds is None:
+        options.frames = 10000
+
+    random.seed(options.seed)
+
+    pygame.mixer.init()
+    pygame.init()
+    pygame.display.set_mode((1080, 720))
+
+    if options.script:
+        source = ScriptedInput(options.script)
+    else:
+        source = RandomInput(options.seed)
+
+    # Dying saves the game, so the save file is put back
+    # the way it was once we're done
+
+    with open('save.pitfall', 'rb') as f:
+        save = f.read()
+
+    try:
+        stats = run(source, options.frames, options.seconds,
+                    options.draw, options.immortal)
+    finally:
+        with open('save.pitfall', 'wb') as f:
+            f.write(save)
+
+    report(stats)
+    pygame.quit()
+
+
+if __name__ == '__main__':
+    main()
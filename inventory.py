@@ -0,0 +1,126 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Pitfall v1.0
+By Danilo Lekovic for Game Design 12
+
+inventory.py
+
+The player's coins, high score and power ups, kept in memory and
+shared by every screen
+"""
+
+import weakref
+from filemanager import FileManager
+
+# Everything the inventory keeps track of
+
+KEYS = ['Coins', 'High Score', '2x Coins', '4x Coins', 'Dead Zone',
+        'Extra Life']
+
+
+# Inventory model
+# Values come from the save file once and are saved back with
+# save(). Anybody can subscribe to hear about changes:
+#
+#     inventory.subscribe(self.changed)   # changed(name, value)
+#
+# Listeners are held weakly so screens that are thrown away
+# don't have to unsubscribe
+
+class Inventory:
+
+    def __init__(self):
+        self.values = None
+        self.changed = set()
+        self.listeners = []
+
+    # Reads the values from the save file (only once)
+
+    def load(self):
+        if self.values is None:
+            self.values = dict((key, FileManager.readOption(key))
+                               for key in KEYS)
+
+        return self.values
+
+    # Forgets the values, they are read again next time
+
+    def reload(self):
+        self.values = None
+        self.changed.clear()
+
+    def get(self, name):
+        return self.load()[name]
+
+    # Changes a value and lets the listeners know
+    # Setting a value to what it already is does nothing
+
+    def set(self, name, value):
+        values = self.load()
+
+        if values[name] == value:
+            return
+
+        values[name] = value
+        self.changed.add(name)
+        self.notify(name, value)
+
+    def add(self, name, amount):
+        self.set(name, self.get(name) + amount)
+
+    # Buys one of an item if there are enough coins
+    # Returns whether the item was bought
+
+    def buy(self, name, cost):
+        if self.get('Coins') < cost:
+            return False
+
+        self.add('Coins', -cost)
+        self.add(name, 1)
+        self.save()
+
+        return True
+
+    # Writes the changed values to the save file in one go
+
+    def save(self):
+        if not self.changed:
+            return
+
+        with FileManager.batch():
+            for name in sorted(self.changed):
+                FileManager.edit(name, self.values[name])
+
+        self.changed.clear()
+
+    # Listener is called with (name, value) after every change
+
+    def subscribe(self, listener):
+        self.listeners = [ref for ref in self.listeners if ref()
+                          is not None]
+
+        if hasattr(listener, '__self__'):
+            self.listeners.append(weakref.WeakMethod(listener))
+        else:
+            self.listeners.append(weakref.ref(listener))
+
+    def unsubscribe(self, listener):
+        self.listeners = [ref for ref in self.listeners if ref()
+                          not in (None, listener)]
+
+    def notify(self, name, value):
+        for ref in list(self.listeners):
+            listener = ref()
+
+            if listener is not None:
+                listener(name, value)
+
+        self.listeners = [ref for ref in self.listeners if ref()
+                          is not None]
+
+
+# Process-wide inventory
+
+inventory = Inventory()
@@ -0,0 +1,50 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Pitfall v1.0
+By Danilo Lekovic for Game Design 12
+
+layers.py
+
+Retained layers: parts of the screen that are drawn once and
+kept until something they show changes
+"""
+
+import pygame
+
+
+# A retained layer owns an area of a target surface
+# Its render function is only run when the inputs given to
+# refresh() are different from last time
+
+class RetainedLayer:
+
+    # Initialize class
+    # render(surface) draws the layer onto surface
+
+    def __init__(self, area, render):
+        self.area = pygame.Rect(area)
+        self.render = render
+        self.inputs = None
+        self.redraws = 0
+
+    # Forces the next refresh to redraw
+
+    def invalidate(self):
+        self.inputs = None
+
+    # Redraws the layer if its inputs changed
+    # The area is wiped with background first
+    # Returns the area that changed, or None
+
+    def refresh(self, target, background, inputs):
+        if inputs == self.inputs:
+            return None
+
+        self.inputs = inputs
+        self.redraws += 1
+        target.blit(background, self.area, self.area)
+        self.render(target)
+
+        return self.area
@@ -0,0 +1,321 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Pitfall v1.0
+By Danilo Lekovic for Game Design 12
+
+levelbank.py
+
+A bank of levels made ahead of time. Instead of placing everything
+at random while the game is running, a level is picked from the
+bank, which is checked once when it's made:
+
+    python levelbank.py                      makes levels.bank
+    python levelbank.py --count 500 --seed 7
+
+The bank is a small binary file:
+
+    magic       4 bytes   b'PFLB'
+    version     uint16
+    kinds       uint16    number of kinds of level
+    table       (offset uint32, count uint32) x kinds
+    records     count x RECORD for every kind
+
+A record is the number of elements in the level (uint8) followed by
+SLOTS x (type uint8, x uint16, y uint16), unused slots are zeros.
+Every record is the same size, so finding a level is one multiply.
+All numbers are little endian. The file is memory-mapped, nothing
+is read until a level is used.
+"""
+
+import os
+import argparse
+import mmap
+import random
+import struct
+import sys
+import pygame
+from entity import *
+
+MAGIC = b'PFLB'
+VERSION = 1
+
+# Where the game looks for the bank
+
+PATH = 'levels.bank'
+
+# Kinds of level, the same as Play.createLevel's
+
+KINDS = 4
+
+# Most elements a level can have
+
+SLOTS = 16
+
+# Type ids, 0 is an empty slot
+
+TYPES = [None, Pit, Ladder, Barrel, Wall, Coin, Ghost, Rat, Snake]
+
+HEADER = struct.Struct('<4sHH')
+TABLE = struct.Struct('<II')
+RECORD = struct.Struct('<B' + 'BHH' * SLOTS)
+
+
+# Something is wrong with a level bank
+
+class BankError(ValueError):
+    pass
+
+
+# Turns a level ([(class, x, y), ...]) into a record
+
+def encodeLevel(layout):
+    if len(layout) > SLOTS:
+        raise BankError('a level can only have {} elements'.format(SLOTS))
+
+    values = [len(layout)]
+
+    for (kind, x, y) in layout:
+        values.extend((TYPES.index(kind), x, y))
+
+    values.extend([0] * (3 * (SLOTS - len(layout))))
+
+    return RECORD.pack(*values)
+
+
+# Turns a record back into a level
+
+def decodeLevel(data, offset=0):
+    values = RECORD.unpack_from(data, offset)
+    count = values[0]
+
+    if count > SLOTS:
+        raise BankError('level has too many elements')
+
+    return [(TYPES[values[i]], values[i + 1], values[i + 2]) for i in
+            range(1, 1 + 3 * count, 3)]
+
+
+# Level bank
+# Opened the first time a level is needed. If there is no bank
+# (or it's broken) load() says so and the game makes its own levels
+
+class LevelBank:
+
+    def __init__(self, path=PATH):
+        self.path = path
+        self.data = None
+        self.table = None
+        self.missing = False
+
+    # Maps the file into memory (only once)
+    # Returns whether there is a bank to use
+
+    def load(self):
+        if self.data is not None:
+            return True
+
+        if self.missing:
+            return False
+
+        try:
+            with open(self.path, 'rb') as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+            self.table = self.read(data)
+            self.data = data
+        except (OSError, ValueError, struct.error) as e:
+            if os.path.exists(self.path):
+                print('Level bank is broken ({}), making levels '
+                      'instead'.format(e), file=sys.stderr)
+
+            self.missing = True
+
+            return False
+
+        return True
+
+    # Checks the header and reads the table of kinds
+    # Returns {kind: (offset, count)}
+
+    def read(self, data):
+        (magic, version, kinds) = HEADER.unpack_from(data)
+
+        if magic != MAGIC:
+            raise BankError('not a level bank')
+
+        if version != VERSION:
+            raise BankError('level bank version {}'.format(version))
+
+        table = {}
+
+        for kind in range(1, kinds + 1):
+            (offset, count) = TABLE.unpack_from(data, HEADER.size
+                    + (kind - 1) * TABLE.size)
+
+            if offset + count * RECORD.size > len(data):
+                raise BankError('level bank is cut short')
+
+            table[kind] = (offset, count)
+
+        return table
+
+    def close(self):
+        if self.data is not None:
+            self.data.close()
+
+        self.data = None
+        self.table = None
+        self.missing = False
+
+    # Opens another bank instead
+
+    def use(self, path):
+        self.close()
+        self.path = path
+
+    # Number of levels of a kind
+
+    def count(self, kind):
+        if not self.load() or kind not in self.table:
+            return 0
+
+        return self.table[kind][1]
+
+    # The level a seed stands for, the same seed always gives the
+    # same level (as long as the bank doesn't change)
+
+    def index(self, kind, seed):
+        return seed % self.count(kind)
+
+    # Level number index of a kind: [(class, x, y), ...]
+
+    def layout(self, kind, index):
+        (offset, count) = self.table[kind]
+
+        if not 0 <= index < count:
+            raise IndexError(index)
+
+        return decodeLevel(self.data, offset + index * RECORD.size)
+
+
+# Writes a bank, levels is {kind: [layout, ...]}
+
+def writeBank(path, levels):
+    kinds = max(levels)
+    offset = HEADER.size + kinds * TABLE.size
+    header = HEADER.pack(MAGIC, VERSION, kinds)
+    records = []
+
+    for kind in range(1, kinds + 1):
+        layouts = levels.get(kind, [])
+        header += TABLE.pack(offset, len(layouts))
+        offset += len(layouts) * RECORD.size
+
+        for layout in layouts:
+            records.append(encodeLevel(layout))
+
+    temporary = path + '.tmp'
+
+    with open(temporary, 'wb') as f:
+        f.write(header)
+        f.write(b''.join(records))
+
+    os.replace(temporary, path)
+
+
+# Whether a level made by Play.createLevel can go in the bank:
+# everything fit, nothing touches and it's all on the screen
+
+def valid(play):
+    if play.unplaced or len(play.level) > SLOTS:
+        return False
+
+    rects = [element.rect for element in play.level]
+
+    for (i, rect) in enumerate(rects):
+        if rect.left < 0 or rect.right > 1080:
+            return False
+
+        if rect.collidelist(rects[i + 1:]) != -1:
+            return False
+
+    return True
+
+
+# Makes count good levels of every kind with Play.createLevel
+# Returns ({kind: [layout, ...]}, how many levels were thrown out)
+
+def generate(count, seed=0):
+    from screen import Play, ScreenManager
+
+    random.seed(seed)
+    play = Play(ScreenManager())
+    play.useLevelBank = False
+    levels = {}
+    rejected = 0
+
+    for kind in range(1, KINDS + 1):
+        layouts = levels[kind] = []
+
+        while len(layouts) < count:
+            play.releaseLevel()
+            play.createLevel(kind)
+
+            if not valid(play):
+                rejected += 1
+                continue
+
+            layouts.append([(type(element), element.rect.x,
+                           element.rect.y) for element in play.level])
+
+    return (levels, rejected)
+
+
+# Process-wide bank
+
+levelBank = LevelBank()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Makes a level bank')
+    parser.add_argument('--count', type=int, default=1000,
+                        help='levels of every kind')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='seed for the levels')
+    parser.add_argument('--output', default=PATH,
+                        help='file to write the bank to')
+    options = parser.parse_args()
+
+    # No window and no sound card needed
+
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+    pygame.mixer.init()
+    pygame.init()
+    pygame.display.set_mode((1080, 720))
+
+    # Making a Play can touch the save file, so it's put back the
+    # way it was once we're done
+
+    with open('save.pitfall', 'rb') as f:
+        save = f.read()
+
+    try:
+        (levels, rejected) = generate(options.count, options.seed)
+    finally:
+        with open('save.pitfall', 'wb') as f:
+            f.write(save)
+
+    writeBank(options.output, levels)
+
+    print('Wrote {} levels to {} ({} bytes, {} rejected)'.format(
+        options.count * KINDS, options.output,
+        os.path.getsize(options.output), rejected))
+    pygame.quit()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Pitfall v1.0
+By Danilo Lekovic for Game Design 12
+
+placement.py
+
+Puts level elements in random places where they don't touch
+anything else, without guessing and trying again
+"""
+
+import bisect
+import random
+import pygame
+
+
+# Lane placer
+# A lane is a horizontal band of the level (a y and a height).
+# Every lane keeps the x-intervals that are taken by something
+# overlapping the band, sorted by their left edge. The free spots
+# for a new element are whatever is left once those are taken out,
+# and the x is picked straight from the free space.
+#
+# Placing an element costs O(n log n) for n elements in its lane
+
+class LanePlacer:
+
+    # Initialize class
+
+    def __init__(self, rng=random):
+        self.rng = rng
+        self.rects = []
+        self.lanes = {}
+
+    # Taken intervals of a lane, made the first time it's used
+
+    def lane(self, top, height):
+        key = (top, top + height)
+        taken = self.lanes.get(key)
+
+        if taken is None:
+            taken = sorted((rect.left, rect.right) for rect in
+                           self.rects if rect.top < key[1]
+                           and rect.bottom > key[0])
+            self.lanes[key] = taken
+
+        return taken
+
+    # Marks a rect as taken in every lane it overlaps
+
+    def block(self, rect):
+        self.rects.append(rect)
+
+        for ((top, bottom), taken) in self.lanes.items():
+            if rect.top < bottom and rect.bottom > top:
+                bisect.insort(taken, (rect.left, rect.right))
+
+    # Free x positions for something width by height at y, from
+    # low to high (both included). Returns [(first, last), ...]
+
+    def free(self, low, high, width, height, y):
+        spots = []
+        start = low
+
+        for (left, right) in self.lane(y, height):
+
+            # Any x from left - width + 1 to right - 1 would overlap
+
+            if left - width + 1 > start:
+                spots.append((start, min(left - width, high)))
+
+            start = max(start, right)
+
+            if start > high:
+                break
+
+        if start <= high:
+            spots.append((start, high))
+
+        return [(first, last) for (first, last) in spots if first
+                <= last]
+
+    # Picks a free x for something width by height at y and marks
+    # it as taken. Returns None if there is no room left
+
+    def place(self, low, high, width, height, y):
+        spots = self.free(low, high, width, height, y)
+        room = sum(last - first + 1 for (first, last) in spots)
+
+        if room == 0:
+            return None
+
+        pick = self.rng.randrange(room)
+
+        for (first, last) in spots:
+            if pick <= last - first:
+                x = first + pick
+                break
+
+            pick -= last - first + 1
+
+        self.block(pygame.Rect(x, y, width, height))
+
+        return x
@@ -12,6 +12,8 @@ Main player
 
 import pygame
 from pygame.locals import *
+from assets import FrameTable
+from animation import Clip, Animation
 
 # Using Pygame's built-in vector system for coordinates
 
@@ -21,11 +23,24 @@ import os
 
 class Player(pygame.sprite.Sprite):
 
+    # Seconds each frame of an animation is shown for
+
+    frameTimes = {
+        'Climbing': 1 / 60.0,
+        'Idle': 2 / 60.0,
+        'Jumping': 1 / 60.0,
+        'Running': 1 / 60.0,
+        }
+
+    # Clips are made once and shared by every player
+
+    clips = {}
+
     # Initialize class
 
     def __init__(self, x, y):
         super().__init__()
-        self.pos = vec(x, y)
+        self.pos = vec(0, 0)
         self.velocity = vec(0, 0)
         self.acceleration = vec(0, 0)
 
@@ -39,6 +54,23 @@ class Player(pygame.sprite.Sprite):
         self.LEFT = 4
         self.RIGHT = 5
         self.CLIMBING = 6
+
+        # Animations are loaded from the sprites folder
+
+        self.animations = {}
+        self.load()
+
+        # What's playing, Play's animator moves it on
+
+        self.animation = Animation(self.clips['Idle'])
+        self.reset(x, y)
+
+    # Puts the player at x, y for a new game
+
+    def reset(self, x, y):
+        self.pos.update(x, y)
+        self.velocity.update(0, 0)
+        self.acceleration.update(0, 0)
         self.currentState = self.STANCE
 
         # Important values
@@ -63,32 +95,26 @@ class Player(pygame.sprite.Sprite):
         self.canMoveRight = True
         self.canMoveLeft = True
 
-        # Animation timers and indexes dictate
-        # the current frame and how long each frame
-        # should last
-
-        self.animationTimer = 0
-        self.animationIndex = 0
-
-        # Animations are loaded from the sprites folder
-
-        self.animations = {}
-        self.load()
-
         # Current sprite is set and rectangle is created
         # for collision detection purposes
 
+        self.animation.play(self.clips['Idle'])
+        self.currentAnimation = 'Idle'
+        self.currentIndex = 0
         self.image = self.animations['Idle'][0]
         self.rect = self.image.get_rect()
         self.rect.move_ip(x, y)
 
     # Changes current sprite and edits rectangle properties
-
-    def changeSprite(self, kind, index=None):
-        if index is None:
-            index = self.animationIndex
-
-        self.image = self.animations[kind][index]
+    # Going from one animation to another keeps the frame it was on
+
+    def changeSprite(self, kind):
+        self.animation.play(self.clips[kind], keep=True)
+        index = self.animation.frame()
+        self.currentAnimation = kind
+        self.currentIndex = index
+        self.image = self.animations[kind].frame(index,
+                self.orientation is self.LEFT)
         self.rect = self.image.get_rect()
         self.rect.center = (self.image.get_width() / 2,
                             self.image.get_height() / 2)
@@ -226,22 +252,26 @@ class Player(pygame.sprite.Sprite):
                 if os.path.exists('Sprites/Player/{}'.format(name)):
                     (path, dirs, files) = \
                         os.walk('Sprites/Player/{}'.format(name)).__next__()
-                    self.animations[name] = []
-                    bufferArray = []
+                    paths = ['Sprites/Player/{}/{}'.format(name, i)
+                             for i in sorted(files) if i.endswith('.png')]
 
-                    for i in files:
-                        if i.endswith('.png'):
-                            bufferArray.append(pygame.image.load('Sprites/Player/{}/{}'.format(name,
-                                    i)))
+                    # Frames facing left are made here once instead
+                    # of flipping the sprite every frame
 
-                    self.animations[name] = bufferArray
+                    self.animations[name] = FrameTable(paths).load()
+                    self.animations[name].mirrored()
+
+                    # The last frame of each is never shown (unless
+                    # it's the only one)
+
+                    if name not in self.clips:
+                        self.clips[name] = Clip(self.animations[name],
+                                self.frameTimes[name],
+                                order=range(max(len(paths) - 1, 1)))
 
     # Handles player orientation so we can use minimal
-    # sprites
+    # sprites. Returns the area of the screen that was drawn on
 
     def draw(self, screen, coords):
-        if self.orientation is self.LEFT:
-            screen.blit(pygame.transform.flip(self.image, True, False),
-                        coords)
-        else:
-            screen.blit(self.image, coords)
\ No newline at end of file
+        return screen.blit(self.animations[self.currentAnimation].frame(self.currentIndex,
+                    self.orientation is self.LEFT), coords)
@@ -0,0 +1,198 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Pitfall v1.0
+By Danilo Lekovic for Game Design 12
+
+profiler.py
+
+Frame timing: where every frame's milliseconds go. F3 in game shows
+the overlay, --profile-csv writes every frame to a file
+"""
+
+import csv
+import time
+import pygame
+from collections import deque
+from glyphfont import getFont
+
+# Parts of a frame, in the order they happen
+
+PHASES = ['events', 'entities', 'player', 'world', 'draw', 'hud',
+          'display', 'tick']
+
+
+# Frame profiler
+# Game.loop calls begin() and end() around every frame and the
+# code in between calls mark(phase) when a phase is over. Each
+# phase gets the time since the previous mark.
+#
+# When nothing is using it (no overlay and no CSV file) every call
+# returns straight away
+
+class FrameProfiler:
+
+    # Initialize class
+    # size is how many frames are kept for the overlay
+
+    def __init__(self, size=600):
+        self.enabled = False
+        self.overlay = False
+        self.frames = deque(maxlen=size)
+        self.current = dict.fromkeys(PHASES, 0.0)
+        self.start = 0.0
+        self.last = 0.0
+
+        # CSV output
+
+        self.file = None
+        self.writer = None
+        self.frameNumber = 0
+
+        # Overlay is only redrawn every few frames
+
+        self.font = None
+        self.surface = None
+        self.age = 0
+
+    # Starts timing a frame
+
+    def begin(self):
+        if not self.enabled:
+            return
+
+        self.start = self.last = time.perf_counter()
+        self.current = dict.fromkeys(PHASES, 0.0)
+
+    # Ends a phase
+
+    def mark(self, phase):
+        if not self.enabled:
+            return
+
+        now = time.perf_counter()
+        self.current[phase] = self.current.get(phase, 0.0) + now \
+            - self.last
+        self.last = now
+
+    # Ends a frame and stores it in the ring buffer (and CSV file)
+    # Times are stored in milliseconds: (total, phase, phase, ...)
+
+    def end(self):
+        if not self.enabled:
+            return
+
+        total = time.perf_counter() - self.start
+        sample = tuple(seconds * 1000.0 for seconds in [total]
+                       + [self.current[phase] for phase in PHASES])
+        self.frames.append(sample)
+        self.frameNumber += 1
+
+        if self.writer is not None:
+            self.writer.writerow([self.frameNumber] + ['{:.4f}'.format(ms)
+                                 for ms in sample])
+
+    # Writes every frame to a CSV file from now on
+
+    def openCsv(self, path):
+        self.file = open(path, 'w', newline='')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(['frame', 'total'] + PHASES)
+        self.enabled = True
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+            self.writer = None
+
+    # Shows or hides the overlay
+
+    def toggleOverlay(self):
+        self.overlay = not self.overlay
+        self.enabled = self.overlay or self.writer is not None
+        self.surface = None
+
+        # Timing starts fresh from here
+
+        self.frames.clear()
+        self.begin()
+
+    # Frames per second, mean time of every phase and
+    # percentiles of the frame time over the ring buffer
+
+    def summary(self):
+        if not self.frames:
+            return None
+
+        count = len(self.frames)
+        means = [sum(frame[i] for frame in self.frames) / count for i in
+                 range(len(PHASES) + 1)]
+        totals = sorted(frame[0] for frame in self.frames)
+
+        def percentile(p):
+            return totals[int(round(p / 100.0 * (count - 1)))]
+
+        return {
+            'fps': 1000.0 / max(means[0], 1e-06),
+            'mean': means[0],
+            'phases': dict(zip(PHASES, means[1:])),
+            'p50': percentile(50),
+            'p90': percentile(90),
+            'p99': percentile(99),
+            'max': totals[-1],
+            }
+
+    # Draws the overlay in the bottom left corner
+    # Returns the part of the screen it covered or None
+
+    def drawOverlay(self, screen):
+        if not self.overlay:
+            return None
+
+        self.age += 1
+
+        if self.surface is None or self.age >= 30:
+            self.age = 0
+            self.surface = self.render()
+
+        return screen.blit(self.surface, (10, 720 - 10
+                           - self.surface.get_height()))
+
+    # Puts the overlay text together
+
+    def render(self):
+        if self.font is None:
+            self.font = getFont(None, 20)
+
+        summary = self.summary()
+        lines = ['Collecting frames...']
+
+        if summary is not None:
+            lines = [
+                '{:.1f} FPS  frame {:.2f} ms'.format(summary['fps'],
+                        summary['mean']),
+                'p50 {:.2f}  p90 {:.2f}  p99 {:.2f}  max {:.2f}'.format(
+                    summary['p50'], summary['p90'], summary['p99'],
+                    summary['max']),
+                ]
+
+            for phase in PHASES:
+                lines.append('{:<10} {:7.3f} ms'.format(phase,
+                             summary['phases'][phase]))
+
+        height = self.font.get_linesize()
+        surface = pygame.Surface((340, 8 + height * (len(PHASES) + 2)))
+        surface.fill((0, 0, 0))
+
+        for (i, line) in enumerate(lines):
+            surface.blit(self.font.render(line, True, (255, 255, 255)),
+                         (6, 4 + i * height))
+
+        return surface
+
+
+# Process-wide profiler
+
+profiler = FrameProfiler()
@@ -0,0 +1,140 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Pitfall v1.0
+By Danilo Lekovic for Game Design 12
+
+savefile.py
+
+The save file format. A save is a small binary file:
+
+    magic       4 bytes   b'PFSV'
+    version     uint16
+    count       uint16    number of fields that follow
+    fields      int32 x count, in the order of FIELDS
+    checksum    uint32    crc32 of everything before it
+
+All numbers are little endian. New fields are only ever added to the
+end of FIELDS (with a new VERSION), so older saves just miss the last
+few fields, which get their defaults, and newer saves have a few
+extra ones, which are skipped.
+"""
+
+import json
+import struct
+import zlib
+
+MAGIC = b'PFSV'
+VERSION = 1
+
+# Every field in a save, in order, with its default value
+
+FIELDS = [
+    ('High Score', 0),
+    ('Coins', 0),
+    ('2x Coins', 0),
+    ('4x Coins', 0),
+    ('Dead Zone', 0),
+    ('Extra Life', 0),
+    ]
+
+NAMES = [name for (name, default) in FIELDS]
+
+HEADER = struct.Struct('<4sHH')
+FIELD = struct.Struct('<i')
+CHECKSUM = struct.Struct('<I')
+
+
+# Something is wrong with a save file
+
+class SaveError(ValueError):
+    pass
+
+
+# A save with nothing in it yet
+
+def defaults():
+    return dict(FIELDS)
+
+
+# Turns save values into the bytes of a save file
+
+def encode(values):
+    for name in values:
+        if name not in NAMES:
+            raise SaveError('{} is not part of a save'.format(name))
+
+    data = HEADER.pack(MAGIC, VERSION, len(FIELDS)) \
+        + struct.pack('<{}i'.format(len(FIELDS)), *[values.get(name,
+                      default) for (name, default) in FIELDS])
+
+    return data + CHECKSUM.pack(zlib.crc32(data))
+
+
+# Reads save values from bytes (or a memoryview, or anything else
+# that supports the buffer protocol)
+
+def decode(data):
+    data = memoryview(data)
+
+    if len(data) < HEADER.size + CHECKSUM.size:
+        raise SaveError('save is too short')
+
+    (magic, version, count) = HEADER.unpack_from(data)
+
+    if magic != MAGIC:
+        raise SaveError('not a save file')
+
+    end = HEADER.size + count * FIELD.size
+
+    if len(data) != end + CHECKSUM.size:
+        raise SaveError('save is the wrong size')
+
+    (checksum, ) = CHECKSUM.unpack_from(data, end)
+
+    if zlib.crc32(data[:end]) != checksum:
+        raise SaveError('save is corrupt')
+
+    values = defaults()
+    stored = struct.unpack_from('<{}i'.format(count), data, HEADER.size)
+
+    for (name, value) in zip(NAMES, stored):
+        values[name] = value
+
+    return values
+
+
+# Whether data is a binary save (and not an old JSON one)
+
+def isBinary(data):
+    return bytes(data[:len(MAGIC)]) == MAGIC
+
+
+# Reads an old JSON save, fields it doesn't have get defaults
+# An empty file is an empty save
+
+def migrate(data):
+    values = defaults()
+    text = bytes(data).decode('utf-8').strip()
+
+    if text:
+        try:
+            old = json.loads(text)
+        except ValueError:
+            raise SaveError('save is neither binary nor JSON')
+
+        for name in NAMES:
+            if name in old:
+                values[name] = int(old[name])
+
+    return values
+
+
+# Reads save values from the contents of a save file of any kind
+
+def load(data):
+    if isBinary(data):
+        return decode(data)
+
+    return migrate(data)
@@ -12,6 +12,7 @@ Multi-screen system. Game file.
 
 import pygame
 import random
+from collections import Counter, OrderedDict
 from pygame.locals import *
 
 # This in particular is why Python 3 is so great!
@@ -20,6 +21,17 @@ from pygame.locals import *
 from abc import ABC, abstractmethod
 
 from player import Player
+from assets import images, sounds, playMusic
+from glyphfont import getFont
+from layers import RetainedLayer
+from profiler import profiler
+from inventory import inventory
+from broadphase import SpatialGrid
+from placement import LanePlacer
+from levelbank import levelBank
+from entitystore import EntityStore
+import entitystore
+from animation import Animator
 from entity import *
 from filemanager import *
 import os
@@ -29,17 +41,105 @@ import os
 
 vec = pygame.math.Vector2
 
+# Every sound effect the screens play (see SoundBank)
+
+EFFECTS = [
+    'Sounds/boom.wav',
+    'Sounds/coin.wav',
+    'Sounds/damage.wav',
+    'Sounds/dead.wav',
+    'Sounds/jump.wav',
+    'Sounds/power.wav',
+    'Sounds/whoosh.wav',
+    ]
+
+
+# Screens the screen manager drops first when it has too many
+# Given the manager, they return the kind of screen to drop (never
+# the one showing) or None to keep them all
+
+def leastRecentlyShown(manager):
+    for (kind, screen) in manager.screens.items():
+        if screen is not manager.currentScreen:
+            return kind
+
+    return None
+
+
+def leastShown(manager):
+    kinds = [kind for (kind, screen) in manager.screens.items()
+             if screen is not manager.currentScreen]
+
+    if not kinds:
+        return None
+
+    return min(kinds, key=lambda kind: manager.visits[kind])
+
 
 # Screen manager dictates what screen we are in
 # Also handles saving in case of crash
+#
+# Screens are made once and shown again after that:
+#
+#     screenManager.show(Store)
+#     screenManager.show(Lose, score, highScore, totalCoins, coins)
+#
+# show() calls exit() on the screen that was showing and enter()
+# (with the rest of its arguments) on the new one. Once more than
+# capacity screens have been made, evict picks which ones to drop
 
 class ScreenManager:
 
-    def __init__(self):
+    def __init__(self, capacity=4, evict=leastRecentlyShown):
         self.currentScreen = None
+        self.screens = OrderedDict()
+        self.visits = Counter()
+        self.capacity = capacity
+        self.evict = evict
+
+        # Statistics
+
+        self.made = 0
+        self.dropped = 0
+
+    # Shows a screen that was made somewhere else
+
+    def set(self, screen, *args):
+        if self.currentScreen is not None and self.currentScreen \
+            is not screen:
+            self.currentScreen.exit()
 
-    def set(self, screen):
         self.currentScreen = screen
+        screen.enter(*args)
+
+    # Shows the screen of a kind, only making it the first time
+
+    def show(self, kind, *args):
+        screen = self.screens.get(kind)
+
+        if screen is None:
+            screen = self.screens[kind] = kind(self)
+            self.made += 1
+        else:
+            self.screens.move_to_end(kind)
+
+        self.visits[kind] += 1
+        self.set(screen, *args)
+        self.trim()
+
+        return screen
+
+    # Drops screens until there are only capacity of them
+
+    def trim(self):
+        while len(self.screens) > self.capacity:
+            kind = self.evict(self)
+
+            if kind is None:
+                break
+
+            del self.screens[kind]
+            self.dropped += 1
 
     def get(self):
         return self.currentScreen
@@ -48,21 +148,7 @@ class ScreenManager:
 
     def saveAll(self):
         if isinstance(self.currentScreen, Play):
-            FileManager.edit('Coins', FileManager.readOption('Coins')
-                             + self.currentScreen.player.coins)
-            FileManager.edit('2x Coins',
-                             self.currentScreen.available2xCoins)
-            FileManager.edit('4x Coins',
-                             self.currentScreen.available4xCoins)
-            FileManager.edit('Dead Zone',
-                             self.currentScreen.availableDeadZone)
-            FileManager.edit('Extra Life',
-                             self.currentScreen.availableExtraLives)
-
-            if self.currentScreen.highScore \
-                < self.currentScreen.player.score:
-                FileManager.edit('High Score',
-                                 self.currentScreen.player.score)
+            self.currentScreen.save()
 
 
 # Screen abstract class
@@ -81,6 +167,29 @@ class Screen(ABC):
     def draw(game):
         pass
 
+    # Screens that move things around do it here, one fixed
+    # step (dt seconds) at a time. Most screens only draw
+
+    def update(self, dt):
+        pass
+
+    # Called every time the screen is shown (with whatever else
+    # ScreenManager.show was given), everything that starts over on
+    # every visit is set here
+
+    def enter(self):
+        pass
+
+    # Called when another screen is shown instead
+
+    def exit(self):
+        pass
+
+    # Asks the screen to draw all of itself next frame
+
+    def invalidate(self):
+        pass
+
     # Every screen needs to handle keys
 
     @abstractmethod
@@ -126,16 +235,29 @@ class ItemElement:
         self.cost = cost
         self.image = image
 
+        # The amount's text is kept until the amount changes
+
+        self.text = None
+        self.textFont = None
+        inventory.subscribe(self.changed)
+
+    def changed(self, name, value):
+        if name == self.name:
+            self.text = None
+
     def getAmount(self):
-        return FileManager.readOption(self.name)
+        return inventory.get(self.name)
 
     def getText(self, font, setAmount=None):
-        if setAmount == None:
-            amount = self.getAmount()
-            return font.render(str(amount), True, (255, 255, 255))
-        else:
-            amount = setAmount
-            return font.render(str(amount), True, (255, 255, 255))
+        if setAmount != None:
+            return font.render(str(setAmount), True, (255, 255, 255))
+
+        if self.text is None or self.textFont is not font:
+            self.text = font.render(str(self.getAmount()), True, (255,
+                                    255, 255))
+            self.textFont = font
+
+        return self.text
 
 
 # The store of the game
@@ -148,48 +270,60 @@ class Store(Screen):
         super(Store, self).__init__(self)
         self.screenManager = screenManager
         self.background = \
-            pygame.image.load('Sprites/Store/Background.png')
+            images.load('Sprites/Store/Background.png')
         self.greenButton = \
-            pygame.image.load('Sprites/Store/GreenButton.png')
+            images.load('Sprites/Store/GreenButton.png')
         self.greenPlacer = \
-            pygame.image.load('Sprites/Store/NumberHolder.png')
+            images.load('Sprites/Store/NumberHolder.png')
 
         # Fonts
 
-        self.font = pygame.font.Font(os.path.join('Pitfall.ttf'), 24)
-        self.coins = FileManager.readOption('Coins')
+        self.font = getFont('Pitfall.ttf', 24)
+        self.coinText = None
+        inventory.subscribe(self.changed)
 
         # Sound effects
 
-        self.soundEnter = pygame.mixer.Sound('Sounds/boom.wav')
-        self.soundWhoosh = pygame.mixer.Sound('Sounds/whoosh.wav')
+        self.soundEnter = sounds.effect('Sounds/boom.wav')
+        self.soundWhoosh = sounds.effect('Sounds/whoosh.wav')
+
+        # All items and their prices
+
+        self.catalogue = [ItemElement('2x Coins', 250,
+                          images.load('Sprites/Store/2xCoins.png')),
+                          ItemElement('4x Coins', 500,
+                          images.load('Sprites/Store/4xCoins.png')),
+                          ItemElement('Dead Zone', 100,
+                          images.load('Sprites/Store/DeadZone.png')),
+                          ItemElement('Extra Life', 100,
+                          images.load('Sprites/Store/ExtraLife.png'))]
+        self.items = list(self.catalogue)
+
+    # Every visit starts at the top of the list
 
+    def enter(self):
         self.selects = 1
+        self.items[:] = self.catalogue
 
         # Money song psychologically convinces player to buy stuff
         # Pay-to-win system ;) $$$$???
 
-        pygame.mixer.music.load('Sounds/money.wav')
-        pygame.mixer.music.play(-1)
+        playMusic('Sounds/money.wav', -1)
 
-        # All items and their prices
+    # Coin text is made again when the coins change
 
-        self.items = [ItemElement('2x Coins', 250,
-                      pygame.image.load('Sprites/Store/2xCoins.png')),
-                      ItemElement('4x Coins', 500,
-                      pygame.image.load('Sprites/Store/4xCoins.png')),
-                      ItemElement('Dead Zone', 100,
-                      pygame.image.load('Sprites/Store/DeadZone.png')),
-                      ItemElement('Extra Life', 100,
-                      pygame.image.load('Sprites/Store/ExtraLife.png'))]
+    def changed(self, name, value):
+        if name == 'Coins':
+            self.coinText = None
 
-    def draw(self, screen):
-        coinText = self.font.render(str(self.coins), True, (255, 255,
-                                    255))
+    def draw(self, screen, alpha=1.0):
+        if self.coinText is None:
+            self.coinText = self.font.render(str(inventory.get('Coins')),
+                    True, (255, 255, 255))
 
         screen.fill((0, 0, 0))
         screen.blit(self.background, (0, 0))
-        screen.blit(coinText, (57, 657))
+        screen.blit(self.coinText, (57, 657))
 
         # 3 currently visible items are added
 
@@ -251,24 +385,17 @@ class Store(Screen):
         # Go back to the main menu
 
             self.soundEnter.play()
-            self.screenManager.set(MainMenu(self.screenManager))
+            self.screenManager.show(MainMenu)
         elif event.type == pygame.KEYDOWN and event.key \
             == pygame.K_RETURN:
 
         # Buy an item
 
-            self.soundEnter.play()
-            if self.coins - self.items[self.selects - 1].cost >= 0:
-                self.coins = self.coins - self.items[self.selects
-                        - 1].cost
-                self.items[self.selects - 1]
-
-                # Coins is saved
+            # Coins and the item are saved
 
-                FileManager.edit('Coins', self.coins)
-                FileManager.edit(self.items[self.selects - 1].name,
-                                 self.items[self.selects
-                                 - 1].getAmount() + 1)
+            self.soundEnter.play()
+            item = self.items[self.selects - 1]
+            inventory.buy(item.name, item.cost)
 
     def mouseClickEvent(self, event):
         pass
@@ -278,18 +405,22 @@ class Store(Screen):
 
 class Lose(Screen):
 
-    def __init__(
+    def __init__(self, screenManager):
+        super(Lose, self).__init__(self)
+        self.screenManager = screenManager
+        self.background = images.load('Sprites/LoseMenu.png')
+        self.font = getFont('Pitfall.ttf', 24)
+        self.soundEnter = sounds.effect('Sounds/boom.wav')
+
+    # Shows how the game that just ended went
+
+    def enter(
         self,
-        screenManager,
         score,
         highScore,
         totalCoins,
         coins,
         ):
-        super(Lose, self).__init__(self)
-        self.screenManager = screenManager
-        self.background = pygame.image.load('Sprites/LoseMenu.png')
-        self.font = pygame.font.Font(os.path.join('Pitfall.ttf'), 24)
         self.text = self.font.render('Score: {}'.format(score), True,
                 (255, 255, 255))
         self.text0 = \
@@ -298,9 +429,13 @@ class Lose(Screen):
         self.text1 = \
             self.font.render('Coins: {} +{}'.format(totalCoins, coins),
                              True, (255, 255, 255))
-        self.soundEnter = pygame.mixer.Sound('Sounds/boom.wav')
 
-    def draw(self, screen):
+        # Sad music
+
+        pygame.mixer.music.stop()
+        playMusic('Sounds/sadness.wav', 0)
+
+    def draw(self, screen, alpha=1.0):
         screen.fill((0, 0, 0))
         screen.blit(self.background, (0, 0))
 
@@ -315,45 +450,113 @@ class Lose(Screen):
 
     def keyDownEvent(self, event):
         if event.type == pygame.KEYUP and event.key == pygame.K_m:
-            self.screenManager.set(MainMenu(self.screenManager))
+            self.screenManager.show(MainMenu)
             self.soundEnter.play()
         if event.type == pygame.KEYUP and event.key == pygame.K_s:
-            self.screenManager.set(Store(self.screenManager))
+            self.screenManager.show(Store)
             self.soundEnter.play()
         elif event.type == pygame.KEYUP and event.key == pygame.K_p:
-            self.screenManager.set(Play(self.screenManager))
+            self.screenManager.show(Play)
             self.soundEnter.play()
 
     def mouseClickEvent(self, event):
         pass
 
 
+# Merges overlapping rectangles so the same pixels aren't
+# sent to the display twice
+
+def mergeRects(rects):
+    merged = []
+
+    for rect in rects:
+        if not rect:
+            continue
+
+        rect = rect.copy()
+        i = rect.collidelist(merged)
+
+        while i != -1:
+            rect.union_ip(merged.pop(i))
+            i = rect.collidelist(merged)
+
+        merged.append(rect)
+
+    return merged
+
+
 # Game screen
 
 class Play(Screen):
 
+    # Dirty rectangle mode only redraws what changed every frame
+    # Turned on with --dirty-rects
+
+    dirtyRendering = False
+
+    # Power ups in the order of the switcher
+
+    powerNames = ['2x Coins', '4x Coins', 'Extra Life', 'Dead Zone']
+
+    # Levels are picked from the level bank when there is one (see
+    # levelbank.py), otherwise they are made up on the spot
+
+    useLevelBank = True
+
+    # The next level is made ahead of time, prepareSteps pieces of
+    # it every step, so the end of the screen only has to swap it in
+
+    prepareLevels = True
+    prepareSteps = 2
+
+    # Barrels, ghosts, rats, snakes and coins can be kept in NumPy
+    # arrays instead (see entitystore.py)
+    # Turned on with --entity-store
+
+    useEntityStore = False
+
     def __init__(self, screenManager):
         super(Play, self).__init__(self)
         self.screenManager = screenManager
         self.player = Player(60, 400)
-        self.backgroundGame = pygame.image.load('Sprites/Background.png')
+        self.backgroundGame = images.load('Sprites/Background.png')
         self.spriteFloor = \
-            pygame.image.load('Sprites/Environment/Floor.png')
-        self.coin = pygame.image.load('Sprites/Environment/Coin/1.png')
-        self.qKey = pygame.image.load('Sprites/Environment/QKey.png')
-        self.eKey = pygame.image.load('Sprites/Environment/EKey.png')
+            images.load('Sprites/Environment/Floor.png')
+        self.coin = images.load('Sprites/Environment/Coin/1.png')
+        self.qKey = images.load('Sprites/Environment/QKey.png')
+        self.eKey = images.load('Sprites/Environment/EKey.png')
         self.enterKey = \
-            pygame.image.load('Sprites/Environment/EnterKey.png')
+            images.load('Sprites/Environment/EnterKey.png')
         self.healthBar = [
-            pygame.image.load('Sprites/Player/Health/1.png'),
-            pygame.image.load('Sprites/Player/Health/2.png'),
-            pygame.image.load('Sprites/Player/Health/3.png'),
-            pygame.image.load('Sprites/Player/Health/4.png'),
-            pygame.image.load('Sprites/Player/Health/5.png'),
-            pygame.image.load('Sprites/Player/Health/6.png'),
+            images.load('Sprites/Player/Health/1.png'),
+            images.load('Sprites/Player/Health/2.png'),
+            images.load('Sprites/Player/Health/3.png'),
+            images.load('Sprites/Player/Health/4.png'),
+            images.load('Sprites/Player/Health/5.png'),
+            images.load('Sprites/Player/Health/6.png'),
             ]
         self.greenPlacer = \
-            pygame.image.load('Sprites/Store/Icons/IconPlacer.png')
+            images.load('Sprites/Store/Icons/IconPlacer.png')
+
+        # The scene is everything that doesn't move: the background,
+        # the floor, HUD icons, walls and ladders. It is made once per
+        # level (see buildScene)
+        # The frame is the scene with the HUD drawn on top
+
+        self.scene = pygame.Surface((1080, 720))
+        self.frame = pygame.Surface((1080, 720))
+        self.nextScene = pygame.Surface((1080, 720))
+        self.nextFrame = pygame.Surface((1080, 720))
+        self.hud = RetainedLayer((28, 28, 972, 97), self.drawHud)
+        self.dirty = []
+        self.lastDirty = []
+        self.fullRedraw = True
+        self.wholeScreen = True
+
+        # Positions from before the last step (see smooth)
+
+        self.previous = {}
+        self.previousPlayer = None
 
         # Dictates what elements will be in the level (this is all changed below)
 
@@ -369,51 +572,93 @@ class Play(Screen):
 
         # Sound effects
 
-        self.soundCoin = pygame.mixer.Sound('Sounds/coin.wav')
-        self.soundDead = pygame.mixer.Sound('Sounds/dead.wav')
-        self.soundPowerUp = pygame.mixer.Sound('Sounds/power.wav')
-        self.soundJump = pygame.mixer.Sound('Sounds/jump.wav')
-        self.soundDamage = pygame.mixer.Sound('Sounds/damage.wav')
-        self.soundWhoosh = pygame.mixer.Sound('Sounds/whoosh.wav')
-
-        # Coins / scores
-
-        self.currentCoins = FileManager.readOption('Coins')
-        self.coinAppend = 10
-        self.highScore = FileManager.readOption('High Score')
+        self.soundCoin = sounds.effect('Sounds/coin.wav')
+        self.soundDead = sounds.effect('Sounds/dead.wav')
+        self.soundPowerUp = sounds.effect('Sounds/power.wav')
+        self.soundJump = sounds.effect('Sounds/jump.wav')
+        self.soundDamage = sounds.effect('Sounds/damage.wav')
+        self.soundWhoosh = sounds.effect('Sounds/whoosh.wav')
 
-        # Power-ups
-
-        self.available2xCoins = FileManager.readOption('2x Coins')
-        self.available4xCoins = FileManager.readOption('4x Coins')
-        self.availableExtraLives = FileManager.readOption('Extra Life')
-        self.availableDeadZone = FileManager.readOption('Dead Zone')
-        self.noMoreLives = False
+        # Power-ups (how many are left is kept in the inventory)
 
         self.icon2XCoins = \
-            pygame.image.load('Sprites/Store/Icons/2xCoins.png')
+            images.load('Sprites/Store/Icons/2xCoins.png')
         self.icon4XCoins = \
-            pygame.image.load('Sprites/Store/Icons/4xCoins.png')
+            images.load('Sprites/Store/Icons/4xCoins.png')
         self.iconExtralife = \
-            pygame.image.load('Sprites/Store/Icons/ExtraLife.png')
+            images.load('Sprites/Store/Icons/ExtraLife.png')
         self.iconDeadZone = \
-            pygame.image.load('Sprites/Store/Icons/DeadZone.png')
+            images.load('Sprites/Store/Icons/DeadZone.png')
 
-        self.powerIndex = 0
         self.powerIcons = [self.icon2XCoins, self.icon4XCoins,
                            self.iconExtralife, self.iconDeadZone]
-        self.usedPowerups = []
 
         # Fonts
 
-        self.font = pygame.font.Font(os.path.join('Pitfall.ttf'), 24)
-        self.sFont = pygame.font.Font(os.path.join('Pitfall.ttf'), 16)
+        self.font = getFont('Pitfall.ttf', 24)
+        self.sFont = getFont('Pitfall.ttf', 16)
 
         # Snow feature! Very cool, thank you!
 
         self.snowing = False
         self.listSnow = []
 
+        # Moves every animation in the level (and the player's) on
+        # every step
+
+        self.animator = Animator()
+
+        # The level, its grid and entity store
+
+        self.level = []
+        self.grid = SpatialGrid()
+        self.store = self.newStore()
+
+        # The next level, made while this one is played (see
+        # prepareLevel)
+
+        self.spareGrid = SpatialGrid()
+        self.spareStore = self.newStore()
+        self.upcoming = None
+        self.preparing = None
+
+        self.reset()
+
+    # Starts a new game
+    # Play is only made once (see ScreenManager.show), every game
+    # after the first starts here instead
+
+    def reset(self):
+
+        # Whatever was left of the last game goes back to the pools
+
+        self.releaseLevel()
+        self.dropNextLevel()
+
+        self.player.reset(60, 400)
+        self.animator.clear()
+        self.animator.add(self.player.animation)
+        self.previous.clear()
+        self.previousPlayer = None
+        self.dirty = []
+        self.lastDirty = []
+
+        # Coins / scores
+
+        self.currentCoins = inventory.get('Coins')
+        self.coinAppend = 10
+        self.highScore = inventory.get('High Score')
+
+        # Power-ups
+
+        self.noMoreLives = False
+        self.powerIndex = 0
+        self.usedPowerups = []
+
+        # Snow feature!
+
+        self.listSnow = []
+
         if self.snowing:
             for i in range(100):
                 x = random.randrange(0, 1080)
@@ -422,20 +667,54 @@ class Play(Screen):
 
         # Creates level randomly
 
-        self.level = []
         self.createLevel()
+        self.buildScene()
+        self.startNextLevel()
+        self.finished = False
+
+    # A game that ended is started over when Play is shown again
+
+    def enter(self):
+        if self.finished:
+            self.reset()
 
         # Plays background music, this is A+ material
 
-        pygame.mixer.music.load('Sounds/background.wav')
-        pygame.mixer.music.play(-1)
+        playMusic('Sounds/background.wav', -1)
+
+    # Nothing is kept while other screens are up, the level goes back
+    # to the pools
+
+    def exit(self):
+        self.releaseLevel()
+        self.dropNextLevel()
+        self.finished = True
 
     # Creates level
     # 4 different kinds of levels to add some variety
+    # kind picks a kind of level instead of a random one
+    # (kind 4 is never picked at random)
+
+    def createLevel(self, kind=None):
+        (layout, self.unplaced, self.levelSeed) = self.planLevel(kind,
+                self.level)
 
-    def createLevel(self):
+        for (entity, x, y) in layout:
+            self.level.append(entity.pool.acquire(x, y))
+
+        self.indexLevel()
+
+    # Works out where everything in a level goes without making any
+    # of it yet. Nothing goes on top of the elements in taken
+    # Returns ([(class, x, y), ...], elements that didn't fit,
+    # seed of the level in the bank or None)
+
+    def planLevel(self, kind=None, taken=()):
         kindOfLevel = random.randrange(1, 4)
 
+        if kind is not None:
+            kindOfLevel = kind
+
         if kindOfLevel is 1:
             self.possibleLadders = 1
             self.possiblePits = 0
@@ -476,285 +755,521 @@ class Play(Screen):
             self.possibleRats = 0
             self.possibleGhosts = 0
 
-        # Every for loop here works the same:
-        #   - Loops through number to generate
-        #   - Creates random X coordinate
-        #   - Checks if anything is touching this previously
-        #   - If it is, create new coordinate. repeat
-        #   - If not, add to level
+        if self.useLevelBank and levelBank.count(kindOfLevel) > 0:
+            seed = random.getrandbits(32)
 
-        # pit y has to be 485
+            return (self.bankLevel(kindOfLevel, seed), [], seed)
 
-        for i in range(self.possiblePits):
-            pitX = random.randint(140, 555)
-            pit = Pit(pitX, 485)
+        # Every element goes somewhere random where it doesn't touch
+        # anything placed before it (see placement.py)
+        # Elements that don't fit anywhere are left out
 
-            for t in self.level:
-                while pit.rect.colliderect(t.rect):
-                    pitX = random.randint(140, 555)
-                    pit = Pit(pitX, 485)
+        placer = LanePlacer()
+        layout = []
+        unplaced = []
 
-            self.level.append(pit)
+        for element in taken:
+            placer.block(element.rect)
 
-        # ladder y has to be 492
+        # pit y has to be 485
 
-        for i in range(self.possibleLadders):
-            holeX = random.randint(140, 1010)
-            ladder = Ladder(holeX, 492)
+        self.spawn(placer, layout, unplaced, Pit, self.possiblePits, 140,
+                   555, 485)
 
-            for t in self.level:
-                while ladder.rect.colliderect(t.rect):
-                    holeX = random.randint(140, 1010)
-                    ladder = Ladder(holeX, 492)
+        # ladder y has to be 492
 
-            self.level.append(ladder)
+        self.spawn(placer, layout, unplaced, Ladder,
+                   self.possibleLadders, 140, 1010, 492)
 
         # barrel y has to be 474
 
-        for i in range(self.possibleBarrels):
-            barrelX = random.randint(340, 1010)
-            barrel = Barrel(barrelX, 474)
+        self.spawn(placer, layout, unplaced, Barrel,
+                   self.possibleBarrels, 340, 1010, 474)
 
-            for t in self.level:
-                while barrel.rect.colliderect(t.rect):
-                    barrelX = random.randint(140, 1010)
-                    barrel = Barrel(barrelX, 474)
+        # wall y has to be 584
 
-            self.level.append(barrel)
+        self.spawn(placer, layout, unplaced, Wall, self.possibleWalls,
+                   140, 1010, 584)
 
-        # wall y has to be 584
+        # coin y has to be 483
 
-        for i in range(self.possibleWalls):
-            wallX = random.randint(140, 1010)
-            wall = Wall(wallX, 584)
+        self.spawn(placer, layout, unplaced, Coin, self.possibleCoins,
+                   140, 1010, 483)
 
-            for t in self.level:
-                while wall.rect.colliderect(t.rect):
-                    wallX = random.randint(140, 1010)
-                    wall = Wall(wallX, 584)
+        # underground coin y has to be 670
 
-            self.level.append(wall)
+        self.spawn(placer, layout, unplaced, Coin,
+                   self.possibleCoinsUnderground, 140, 1010, 670)
 
-        # coin y has to be 483
+        # ghost y has to be 605
 
-        for i in range(self.possibleCoins):
-            coinX = random.randint(140, 1010)
-            coin = Coin(coinX, 483)
+        self.spawn(placer, layout, unplaced, Ghost, self.possibleGhosts,
+                   140, 1010, 605)
 
-            for t in self.level:
-                while coin.rect.colliderect(t.rect):
-                    coinX = random.randint(140, 1010)
-                    coin = Coin(coinX, 483)
+        # rat y has to be 679
 
-            self.level.append(coin)
+        self.spawn(placer, layout, unplaced, Rat, self.possibleRats, 140,
+                   1010, 679)
 
-        # underground coin y has to be 670
+        # snake y has to be 466
 
-        for i in range(self.possibleCoinsUnderground):
-            coinX = random.randint(140, 1010)
-            coin = Coin(coinX, 670)
+        self.spawn(placer, layout, unplaced, Snake, self.possibleSnakes,
+                   140, 1010, 466)
 
-            for t in self.level:
-                while coin.rect.colliderect(t.rect):
-                    coinX = random.randint(140, 1010)
-                    coin = Coin(coinX, 670)
+        return (layout, unplaced, None)
 
-            self.level.append(coin)
+    # Level from the bank
+    # The same kind and seed always give the same level, so
+    # self.levelSeed is enough to play a level again
 
-        # ghost y has to be 605
+    def bankLevel(self, kind, seed):
+        layout = levelBank.layout(kind, levelBank.index(kind, seed))
 
-        for i in range(self.possibleGhosts):
-            ghostX = random.randint(140, 1010)
-            ghost = Ghost(ghostX, 605)
+        # Dead Zone takes the animals out
 
-            for t in self.level:
-                while ghost.rect.colliderect(t.rect):
-                    ghostX = random.randint(140, 1010)
-                    ghost = Ghost(ghostX, 605)
+        if 3 in self.usedPowerups:
+            layout = [item for item in layout if item[0] not in (Snake,
+                      Rat, Ghost)]
 
-            self.level.append(ghost)
+        return layout
 
-        # rat y has to be 679
+    # Adds count elements of a kind at height y to layout, anywhere
+    # from low to high. Sizes come from the kind's frame table so no
+    # sprite is made until we know where it goes
 
-        for i in range(self.possibleRats):
-            ratX = random.randint(140, 1010)
-            rat = Rat(ratX, 679)
+    def spawn(self, placer, layout, unplaced, kind, count, low, high, y):
+        (width, height) = kind.frames.load().sizes[0]
 
-            for t in self.level:
-                while rat.rect.colliderect(t.rect):
-                    ratX = random.randint(140, 1010)
-                    rat = Rat(ratX, 679)
+        for i in range(count):
+            x = placer.place(low, high, width, height, y)
 
-            self.level.append(rat)
+            if x is None:
+                unplaced.append(kind.__name__)
+            else:
+                layout.append((kind, x, y))
 
-        # snake y has to be 466
+    # Takes an element out of the level, it goes back to its pool
 
-        for i in range(self.possibleSnakes):
-            snakeX = random.randint(140, 1010)
-            snake = Snake(snakeX, 466)
+    def removeElement(self, element):
+        self.level.remove(element)
 
-            for t in self.level:
-                while snake.rect.colliderect(t.rect):
-                    snakeX = random.randint(140, 1010)
-                    snake = Snake(snakeX, 466)
+        if self.store is not None and element in self.store:
+            self.store.remove(element)
+        else:
+            self.grid.remove(element)
+            self.animator.remove(element.animation)
 
-            self.level.append(snake)
+        element.release()
+
+    # Gives every element of the level back to its pool
+
+    def releaseLevel(self):
+        for element in self.level:
+            self.animator.remove(element.animation)
+            element.release()
+
+        self.level = []
+        self.grid.clear()
+
+        if self.store is not None:
+            self.store.clear()
+
+    # Files every element of the level in the grid
+    # Collisions only look at elements near the player
+
+    def indexLevel(self):
+        self.grid.clear()
+
+        if self.store is not None:
+            self.store.clear()
+
+        for element in self.level:
+            self.track(element, self.grid, self.store)
+            self.animate(element)
+
+    # Files an element in the entity store if it can go there and
+    # in the grid otherwise
+
+    def track(self, element, grid, store):
+        if store is not None and store.holds(element):
+            store.add(element)
+        else:
+            grid.insert(element)
+
+    # Hands an element's animation to the animator, unless the entity
+    # store animates it (or it's a still picture)
+
+    def animate(self, element):
+        if self.store is not None and element in self.store:
+            return
+
+        if not element.animation.clip.still():
+            self.animator.add(element.animation)
+
+    # A new entity store, or None if it's turned off (or there is
+    # no NumPy)
+
+    def newStore(self):
+        if self.useEntityStore and entitystore.available:
+            return EntityStore()
+
+        return None
+
+    # Kinds of element the entity store looks after
+
+    def storedKinds(self):
+        if self.store is None:
+            return ()
+
+        return self.store.kinds
+
+    # Draws everything that stays still into the scene
+    # Walls and ladders never move so they are drawn here once
+    # instead of every frame
+
+    def buildScene(self):
+        self.drawScene(self.scene, self.level)
+        self.frame.blit(self.scene, (0, 0))
+        self.hud.invalidate()
+        self.fullRedraw = True
+
+    # Draws the scene of a level onto surface
+
+    def drawScene(self, surface, level):
+        surface.fill((0, 0, 0))
+        surface.blit(self.backgroundGame, (0, 0))
+        surface.blit(self.spriteFloor, (0, 474))
+        surface.blit(self.coin, (60, 90))
+        surface.blit(self.qKey, (280, 46))
+        surface.blit(self.eKey, (377, 46))
+
+        for element in level:
+            if isinstance(element, Wall) or isinstance(element, Ladder):
+                surface.blit(element.image, (element.pos.x,
+                             element.pos.y))
+
+    # Starts making the next level
+
+    def startNextLevel(self):
+        self.upcoming = None
+        self.preparing = None
+
+        if self.prepareLevels:
+            self.preparing = self.prepareLevel()
+
+    # Makes the next level one piece at a time: the plan, every
+    # element, its scene and its frame. When it's done it's in
+    # self.upcoming (the level, its grid and store, what didn't fit
+    # and its seed), self.nextScene and self.nextFrame
+    # The spare grid and entity store are the ones the level before
+    # used, they are emptied first
+
+    def prepareLevel(self):
+        (layout, unplaced, seed) = self.planLevel()
+        level = []
+        grid = self.spareGrid
+        store = self.spareStore
+        grid.clear()
+
+        if store is not None:
+            store.clear()
+
+        yield
+
+        try:
+            for (entity, x, y) in layout:
+                element = entity.pool.acquire(x, y)
+                level.append(element)
+                self.track(element, grid, store)
+
+                yield
+
+            self.drawScene(self.nextScene, level)
+
+            yield
+        except GeneratorExit:
+
+            # Stopped half way (see dropNextLevel)
+
+            for element in level:
+                element.release()
+
+            raise
+
+        self.nextFrame.blit(self.nextScene, (0, 0))
+        self.upcoming = (level, grid, store, unplaced, seed)
+
+    # Gives the level made ahead of time (or what there is of it)
+    # back to the pools
+
+    def dropNextLevel(self):
+        if self.preparing is not None:
+            self.preparing.close()
+
+        if self.upcoming is not None:
+            for element in self.upcoming[0]:
+                element.release()
+
+        self.upcoming = None
+        self.preparing = None
+
+    # Works on the next level for a few pieces, or until it's done
+    # if steps is None
+
+    def prepare(self, steps=None):
+        while self.preparing is not None and steps != 0:
+            try:
+                next(self.preparing)
+            except StopIteration:
+                self.preparing = None
+
+            if steps is not None:
+                steps -= 1
+
+    # Moves on to the next level
+    # It's normally ready by now, so this only swaps it in
+
+    def nextLevel(self):
+        if not self.prepareLevels:
+            self.releaseLevel()
+            self.createLevel()
+            self.buildScene()
+
+            return
+
+        self.prepare()
+        (level, grid, store, self.unplaced, self.levelSeed) = \
+            self.upcoming
+        self.releaseLevel()
+        self.spareGrid = self.grid
+        self.spareStore = self.store
+        self.level = level
+        self.grid = grid
+        self.store = store
+        (self.scene, self.nextScene) = (self.nextScene, self.scene)
+        (self.frame, self.nextFrame) = (self.nextFrame, self.frame)
+
+        for element in self.level:
+            self.animate(element)
+
+        # Dead Zone might have been used after the level was made
+
+        if 3 in self.usedPowerups:
+            for element in self.level[:]:
+                if isinstance(element, Snake) or isinstance(element,
+                        Rat) or isinstance(element, Ghost):
+                    self.removeElement(element)
+
+        # The HUD isn't on the new frame yet
+
+        self.hud.invalidate()
+        self.fullRedraw = True
+        self.startNextLevel()
+
+    # Everything the HUD shows
+    # The HUD is only drawn again when one of these changes
+
+    def hudInputs(self):
+        return (
+            self.player.health,
+            self.currentCoins + self.player.coins,
+            self.player.score,
+            self.highScore,
+            self.powerIndex,
+            tuple(self.usedPowerups),
+            inventory.get('2x Coins'),
+            inventory.get('4x Coins'),
+            inventory.get('Extra Life'),
+            inventory.get('Dead Zone'),
+            )
+
+    # Draws the HUD: health bar, coins, power up switcher and scores
+
+    def drawHud(self, surface):
+        if 1 <= self.player.health <= 6:
+            surface.blit(self.healthBar[6 - self.player.health], (28,
+                         28))
 
-    def draw(self, screen):
-        screen.fill((0, 0, 0))
-        screen.blit(self.backgroundGame, (0, 0))
-        screen.blit(self.spriteFloor, (0, 474))
-        screen.blit(self.coin, (60, 90))
         coinText = self.font.render(str(self.currentCoins
                                     + self.player.coins), True, (255,
                                     255, 255))
-        screen.blit(coinText, (104, 90))
-        screen.blit(self.qKey, (280, 46))
-        screen.blit(self.eKey, (377, 46))
+        surface.blit(coinText, (104, 90))
 
-        screen.blit(self.powerIcons[self.powerIndex], (323, 37))
-        screen.blit(self.greenPlacer, (350, 65))
+        surface.blit(self.powerIcons[self.powerIndex], (323, 37))
+        surface.blit(self.greenPlacer, (350, 65))
 
         # Draws the power up switcher
         # Shows '!' if powerup is in use
         # Also shows number of powerups
 
-        if self.powerIndex == 0:
-            text0 = self.sFont.render(str(self.available2xCoins), True,
-                    (255, 255, 255))
+        if self.powerIndex in self.usedPowerups:
+            text0 = self.sFont.render('!', True, (255, 255, 255))
+        else:
+            available = inventory.get(self.powerNames[self.powerIndex])
+            text0 = self.sFont.render(str(available), True, (255, 255,
+                    255))
 
-            if self.powerIndex in self.usedPowerups:
-                text0 = self.sFont.render('!', True, (255, 255, 255))
+        surface.blit(text0, (350 + 24 / 2 - text0.get_width() / 2, 65
+                     + 24 / 2 - text0.get_height() / 2))
 
-            screen.blit(text0, (350 + 24 / 2 - text0.get_width() / 2,
-                        65 + 24 / 2 - text0.get_height() / 2))
-        elif self.powerIndex == 1:
-            text0 = self.sFont.render(str(self.available4xCoins), True,
-                    (255, 255, 255))
+        # Current score and high score
 
-            if self.powerIndex in self.usedPowerups:
-                text0 = self.sFont.render('!', True, (255, 255, 255))
+        text = self.font.render(str(self.player.score), True, (255,
+                                255, 255))
+        surface.blit(text, (1000 - text.get_width(), 28))
 
-            screen.blit(text0, (350 + 24 / 2 - text0.get_width() / 2,
-                        65 + 24 / 2 - text0.get_height() / 2))
-        elif self.powerIndex == 2:
-            text0 = self.sFont.render(str(self.availableExtraLives),
-                    True, (255, 255, 255))
+        HStext = self.font.render(str(self.highScore), True, (255, 213,
+                                  0))
+        surface.blit(HStext, (1000 - HStext.get_width(), 58))
 
-            if self.powerIndex in self.usedPowerups:
-                text0 = self.sFont.render('!', True, (255, 255, 255))
+    # Wipes out the last frame
+    # In dirty rectangle mode only the parts that changed are
+    # put back, otherwise the whole background is drawn
 
-            screen.blit(text0, (350 + 24 / 2 - text0.get_width() / 2,
-                        65 + 24 / 2 - text0.get_height() / 2))
-        elif self.powerIndex == 3:
-            text0 = self.sFont.render(str(self.availableDeadZone),
-                    True, (255, 255, 255))
+    def restore(self, screen):
+        self.dirty = []
+        self.wholeScreen = not self.dirtyRendering or self.fullRedraw
+        self.fullRedraw = False
+
+        if self.wholeScreen:
+            screen.blit(self.frame, (0, 0))
+        else:
+            for rect in self.lastDirty:
+                screen.blit(self.frame, rect, rect)
+
+    def invalidate(self):
+        self.fullRedraw = True
+
+    # Draws a surface and remembers which part of the screen changed
+
+    def blit(self, screen, surface, pos):
+        self.dirty.append(screen.blit(surface, pos))
+
+    # Brings the HUD up to date and puts it on the screen
+    # if it changed
+
+    def refreshHud(self, screen):
+        area = self.hud.refresh(self.frame, self.scene, self.hudInputs())
+
+        if area is not None:
+            screen.blit(self.frame, area, area)
+            self.dirty.append(area)
 
-            if self.powerIndex in self.usedPowerups:
-                text0 = self.sFont.render('!', True, (255, 255, 255))
+    # Returns the parts of the screen that have to be updated
+    # (what was drawn now and what was drawn last frame)
+    # None means the whole screen
 
-            screen.blit(text0, (350 + 24 / 2 - text0.get_width() / 2,
-                        65 + 24 / 2 - text0.get_height() / 2))
+    def finish(self):
+        changed = None
 
-        # Handles collision for every element in game
+        if not self.wholeScreen:
+            changed = mergeRects(self.lastDirty + self.dirty)
+
+        self.lastDirty = self.dirty
+
+        return changed
+
+    # Runs one step of the game
+    # Game.loop calls this a fixed number of times per second no
+    # matter how fast frames are drawn, dt is the length of a step
+
+    def update(self, dt):
+
+        # Every animation moves on at once
+
+        self.animator.advance(dt)
+
+        # Remembers where everything was so drawing can
+        # smooth out movement between steps
+
+        self.previous.clear()
+        stored = self.storedKinds()
 
         for element in self.level:
-            if isinstance(element, Coin):
+            if type(element) not in stored:
+                self.previous[element] = (element.pos.x, element.pos.y)
+
+        self.previousPlayer = (self.player.pos.x, self.player.pos.y)
+
+        # Updates every element in game
+        # Only the ones that move or change size need to tell the grid
+        # (walls and ladders never change)
+        # The ones in the entity store all go at once
+
+        if self.store is not None:
+            self.store.step(dt)
+
+        for element in self.level:
+            if type(element) in stored:
+                continue
+
+            if isinstance(element, Coin) or isinstance(element, Snake):
+                element.update()
+            elif isinstance(element, Barrel) or isinstance(element,
+                    Ghost) or isinstance(element, Rat) \
+                or isinstance(element, Pit):
                 element.update()
-                screen.blit(element.image, (element.pos.x,
-                            element.pos.y))
+                self.grid.move(element)
+
+        # Handles collision for every element touching the player
+
+        touching = self.grid.query(self.player.rect)
 
-                if element.rect.colliderect(self.player.rect):
-                    self.level.remove(element)
-                    self.player.coins += self.coinAppend
-                    self.soundCoin.play()
+        if self.store is not None:
+            touching += self.store.touching(self.player.rect)
+
+        for element in touching:
+            if isinstance(element, Coin):
+                self.removeElement(element)
+                self.player.coins += self.coinAppend
+                self.soundCoin.play()
             elif isinstance(element, Barrel) or isinstance(element,
                     Ghost) or isinstance(element, Snake) \
                 or isinstance(element, Rat):
 
-                element.update()
-                screen.blit(element.image, (element.pos.x,
-                            element.pos.y))
-
-                if element.rect.colliderect(self.player.rect):
-                    self.level.remove(element)
-                    self.player.health -= 1
-                    self.soundDamage.play()
+                self.removeElement(element)
+                self.player.health -= 1
+                self.soundDamage.play()
             elif isinstance(element, Pit):
-                element.update()
-
                 if element.drawing:
-                    screen.blit(element.image, (element.pos.x,
-                                element.pos.y))
-
-                    if element.rect.colliderect(self.player.rect):
-                        self.player.health = 1
-                        self.soundDamage.play()
-            else:
-                screen.blit(element.image, (element.pos.x,
-                            element.pos.y))
-
-            continue
+                    self.player.health = 1
+                    self.soundDamage.play()
 
         # Creates next stage when player reaches end
 
         if self.player.pos.x >= 1060:
             self.player.pos.x = 0
-            self.level = []
-            self.createLevel()
+            self.nextLevel()
             self.player.score += 100
 
-        # Updates animation
+        profiler.mark('entities')
 
-        self.player.animationTimer += 1
+        # Picks the player's animation (the animator moves it on at
+        # the start of every step)
 
         # This 4-branch conditional statement works like this:
         #   - Checks player state
-        #   - Draws depending on the state and handles all
-        #     major changes the player is having
+        #   - Picks the sprite depending on the state and handles
+        #     all major changes the player is having
 
         if self.player.currentState is self.player.STANCE:
             self.player.stop()
             self.player.doubled = False
-
-            if self.player.animationIndex \
-                >= len(self.player.animations['Idle']) - 1:
-                self.player.animationIndex = 0
-
             self.player.changeSprite('Idle')
-            self.player.draw(screen, (self.player.pos.x,
-                             self.player.pos.y))
-
-            if self.player.animationTimer >= 2:
-                self.player.animationTimer = 0
-
-                if self.player.animationIndex \
-                    >= len(self.player.animations['Idle']) - 1:
-                    self.player.animationIndex = 0
-                    self.player.backwardsAnimation = True
-                else:
-                    self.player.animationIndex = \
-                        self.player.animationIndex + 1
         elif self.player.currentState is self.player.RUNNING:
-            if self.player.animationIndex \
-                >= len(self.player.animations['Running']) - 1:
-                self.player.animationIndex = 0
-
             self.player.doubled = False
 
             canMoveRight = True
             canMoveLeft = True
 
-            for element in self.level:
-                if isinstance(element, Wall):
-                    if element.rect.colliderect(self.player.rect):
-                        if element.pos.x < self.player.pos.x:
-                            canMoveLeft = False
-                            canMoveRight = True
-                        elif element.pos.x > self.player.pos.x:
-                            canMoveRight = False
-                            canMoveLeft = True
-                    break
+            for element in self.grid.query(self.player.rect, Wall):
+                if element.pos.x < self.player.pos.x:
+                    canMoveLeft = False
+                    canMoveRight = True
+                elif element.pos.x > self.player.pos.x:
+                    canMoveRight = False
+                    canMoveLeft = True
+                break
 
             if self.player.orientation is self.player.RIGHT:
                 if canMoveRight:
@@ -768,70 +1283,27 @@ class Play(Screen):
                     self.player.stop()
 
             self.player.changeSprite('Running')
-            self.player.draw(screen, (self.player.pos.x,
-                             self.player.pos.y))
-
-            if self.player.animationTimer >= 0:
-                self.player.animationTimer = 0
-
-                if self.player.animationIndex \
-                    >= len(self.player.animations['Running']) - 1:
-                    self.player.animationIndex = 0
-                else:
-                    self.player.animationIndex += 1
         elif self.player.currentState is self.player.CLIMBING:
-            if self.player.animationIndex \
-                >= len(self.player.animations['Climbing']) - 1:
-                self.player.animationIndex = 0
-
             self.player.doubled = False
 
             self.player.changeSprite('Climbing')
-            self.player.draw(screen, (self.player.pos.x,
-                             self.player.pos.y))
 
             self.player.pos.y -= 17
 
             if self.player.pos.y <= 400:
                 self.player.currentState = self.player.STANCE
-
-            if self.player.animationTimer >= 1:
-                self.player.animationTimer = 0
-
-                if self.player.animationIndex \
-                    >= len(self.player.animations['Climbing']) - 1:
-                    self.player.animationIndex = 0
-                else:
-                    self.player.animationIndex += 1
         elif self.player.currentState is self.player.JUMPING:
-            if self.player.animationIndex \
-                >= len(self.player.animations['Jumping']) - 1:
-                self.player.animationIndex = 0
-
             self.player.changeSprite('Jumping')
-            self.player.draw(screen, (self.player.pos.x,
-                             self.player.pos.y))
-
-            if self.player.animationTimer >= 1:
-                self.player.animationTimer = 0
-
-                if self.player.animationIndex \
-                    >= len(self.player.animations['Jumping']) - 1:
-                    self.player.animationIndex = 0
-                else:
-                    self.player.animationIndex += 1
 
         # Updates player positions and sprites
 
         self.player.update()
+        profiler.mark('player')
 
         # Snow feature!
 
         if self.snowing:
             for i in range(len(self.listSnow)):
-                pygame.draw.circle(screen, (255, 255, 255),
-                                   self.listSnow[i], 2)
-
                 self.listSnow[i][1] += 1
 
                 if self.listSnow[i][1] > 500:
@@ -840,58 +1312,102 @@ class Play(Screen):
                     x = random.randrange(0, 1080)
                     self.listSnow[i][0] = x
 
-        # Handles player health and changes health bar
-        # Also handles Extra Life powerup
-
-        if self.player.health is 6:
-            screen.blit(self.healthBar[0], (28, 28))
-        elif self.player.health is 5:
-            screen.blit(self.healthBar[1], (28, 28))
-        elif self.player.health is 4:
-            screen.blit(self.healthBar[2], (28, 28))
-        elif self.player.health is 3:
-            screen.blit(self.healthBar[3], (28, 28))
-        elif self.player.health is 2:
-            screen.blit(self.healthBar[4], (28, 28))
-        elif self.player.health is 1 and 2 not in self.usedPowerups:
+        # Handles death and the Extra Life powerup
+        # (the health bar is part of the HUD)
+
+        if self.player.health == 1 and 2 not in self.usedPowerups:
 
             # Handles death
             # Loads sad music and final info
 
-            screen.blit(self.healthBar[5], (28, 28))
             self.soundDead.play()
-            totalCoins = FileManager.readOption('Coins') \
-                + self.player.coins
-            self.screenManager.set(Lose(self.screenManager,
-                                   self.player.score, self.highScore,
-                                   totalCoins, self.player.coins))
-            pygame.mixer.music.stop()
-            pygame.mixer.music.load('Sounds/sadness.wav')
-            pygame.mixer.music.play(0)
-            FileManager.edit('Coins', totalCoins)
-            FileManager.edit('2x Coins', self.available2xCoins)
-            FileManager.edit('4x Coins', self.available4xCoins)
-            FileManager.edit('Dead Zone', self.availableDeadZone)
-            FileManager.edit('Extra Life', self.availableExtraLives)
-
-            if self.highScore < self.player.score:
-                FileManager.edit('High Score', self.player.score)
-        elif self.player.health is 1 and 2 in self.usedPowerups and not noMoreLives:
+            self.save()
+            self.screenManager.show(Lose, self.player.score,
+                                    self.highScore,
+                                    inventory.get('Coins'),
+                                    self.player.coins)
+        elif self.player.health == 1 and 2 in self.usedPowerups \
+            and not self.noMoreLives:
             self.player.pos.x = 60
             self.player.health = 6
             self.noMoreLives = True
-            if self.availableExtraLives > 0:
-                self.availableExtraLives -= 1
+            if inventory.get('Extra Life') > 0:
+                inventory.add('Extra Life', -1)
 
-        # Current score and high score
+        # Works on the next level a little
 
-        text = self.font.render(str(self.player.score), True, (255,
-                                255, 255))
-        screen.blit(text, (1000 - text.get_width(), 28))
+        self.prepare(self.prepareSteps)
+        profiler.mark('world')
 
-        HStext = self.font.render(str(self.highScore), True, (255, 213,
-                                  0))
-        screen.blit(HStext, (1000 - HStext.get_width(), 58))
+    # Adds the coins picked up to the ones from before and saves
+    # them along with the power ups left and the high score
+
+    def save(self):
+        inventory.set('Coins', self.currentCoins + self.player.coins)
+
+        if inventory.get('High Score') < self.player.score:
+            inventory.set('High Score', self.player.score)
+
+        inventory.save()
+
+    # Where to draw something that moved from previous to pos
+    # alpha is how far we are between the last step and the next
+    # Big jumps (a new level, an extra life) aren't smoothed
+
+    def smooth(self, previous, pos, alpha):
+        if previous is None or abs(pos.x - previous[0]) > 64 \
+            or abs(pos.y - previous[1]) > 64:
+            return (pos.x, pos.y)
+
+        return (previous[0] + (pos.x - previous[0]) * alpha,
+                previous[1] + (pos.y - previous[1]) * alpha)
+
+    # Draws the game, nothing in here changes the game itself
+
+    def draw(self, screen, alpha=1.0):
+        self.restore(screen)
+
+        # Walls and ladders are part of the scene
+        # The entity store draws its own after everything else
+
+        stored = self.storedKinds()
+
+        for element in self.level:
+            if isinstance(element, Wall) or isinstance(element, Ladder):
+                continue
+
+            if type(element) in stored:
+                continue
+
+            if isinstance(element, Pit) and not element.drawing:
+                continue
+
+            self.blit(screen, element.image,
+                      self.smooth(self.previous.get(element),
+                      element.pos, alpha))
+
+        if self.store is not None:
+            self.dirty.extend(self.store.draw(screen, alpha))
+
+        self.dirty.append(self.player.draw(screen,
+                          self.smooth(self.previousPlayer,
+                          self.player.pos, alpha)))
+
+        # Snow feature!
+
+        if self.snowing:
+            for flake in self.listSnow:
+                self.dirty.append(pygame.draw.circle(screen, (255,
+                                  255, 255), flake, 2))
+
+        profiler.mark('draw')
+
+        # HUD goes on last
+
+        self.refreshHud(screen)
+        profiler.mark('hud')
+
+        return self.finish()
 
     # Handles movement
 
@@ -924,19 +1440,13 @@ class Play(Screen):
                 self.soundJump.play()
         elif event.type == pygame.KEYDOWN and event.key \
             == pygame.K_DOWN:
-            for element in self.level:
-                if isinstance(element, Ladder):
-                    if element.rect.colliderect(self.player.rect):
-                        self.player.currentState = self.player.CLIMBING
-                        self.player.fall()
-                    break
+            if self.grid.query(self.player.rect, Ladder):
+                self.player.currentState = self.player.CLIMBING
+                self.player.fall()
         elif event.type == pygame.KEYDOWN and event.key == pygame.K_UP:
-            for element in self.level:
-                if isinstance(element, Ladder):
-                    if element.rect.colliderect(self.player.rect):
-                        self.player.currentState = self.player.CLIMBING
-                        self.player.rise()
-                    break
+            if self.grid.query(self.player.rect, Ladder):
+                self.player.currentState = self.player.CLIMBING
+                self.player.rise()
         elif event.type == pygame.KEYDOWN and event.key == pygame.K_q:
             if self.powerIndex == 0:
                 self.powerIndex = len(self.powerIcons) - 1
@@ -957,34 +1467,36 @@ class Play(Screen):
         # Handles powerups being used
 
             if self.powerIndex not in self.usedPowerups:
-                if self.powerIndex == 0 and self.available2xCoins > 0:
+                if self.powerIndex == 0 and inventory.get('2x Coins') \
+                    > 0:
                     self.usedPowerups.append(self.powerIndex)
                     self.soundPowerUp.play()
                     self.coinAppend = self.coinAppend * 2
-                    self.available2xCoins -= 1
-                elif self.powerIndex == 1 and self.available4xCoins > 0:
+                    inventory.add('2x Coins', -1)
+                elif self.powerIndex == 1 and inventory.get('4x Coins') \
+                    > 0:
                     self.usedPowerups.append(self.powerIndex)
                     self.soundPowerUp.play()
                     self.coinAppend = self.coinAppend * 4
-                    self.available4xCoins -= 1
-                elif self.powerIndex == 2 and self.availableExtraLives \
+                    inventory.add('4x Coins', -1)
+                elif self.powerIndex == 2 and inventory.get('Extra Life') \
                     > 0:
                     self.usedPowerups.append(self.powerIndex)
                     self.soundPowerUp.play()
-                    self.availableExtraLives -= 1
-                elif self.powerIndex == 3 and self.availableDeadZone \
+                    inventory.add('Extra Life', -1)
+                elif self.powerIndex == 3 and inventory.get('Dead Zone') \
                     > 0:
                     self.usedPowerups.append(self.powerIndex)
                     self.soundPowerUp.play()
-                    self.availableDeadZone -= 1
+                    inventory.add('Dead Zone', -1)
 
                     # Eliminates all animals
 
-                    for element in self.level:
+                    for element in self.level[:]:
                         if isinstance(element, Ghost) \
                             or isinstance(element, Snake) \
                             or isinstance(element, Rat):
-                            self.level.remove(element)
+                            self.removeElement(element)
 
     def mouseClickEvent(self, event):
         pass
@@ -997,29 +1509,32 @@ class MainMenu(Screen):
     def __init__(self, screenManager):
         super(MainMenu, self).__init__(self)
         self.screenManager = screenManager
-        self.backgroundMenu = pygame.image.load('Sprites/Menu.png')
-        self.buttonPlay = pygame.image.load('Sprites/Menu/Play.png')
+        self.backgroundMenu = images.load('Sprites/Menu.png')
+        self.buttonPlay = images.load('Sprites/Menu/Play.png')
         self.buttonPlaySelected = \
-            pygame.image.load('Sprites/Menu/Play-Selected.png')
-        self.buttonStore = pygame.image.load('Sprites/Menu/Store.png')
+            images.load('Sprites/Menu/Play-Selected.png')
+        self.buttonStore = images.load('Sprites/Menu/Store.png')
         self.buttonStoreSelected = \
-            pygame.image.load('Sprites/Menu/Store-Selected.png')
-        self.buttonQuit = pygame.image.load('Sprites/Menu/Quit.png')
+            images.load('Sprites/Menu/Store-Selected.png')
+        self.buttonQuit = images.load('Sprites/Menu/Quit.png')
         self.buttonQuitSelected = \
-            pygame.image.load('Sprites/Menu/Quit-Selected.png')
-        self.soundEnter = pygame.mixer.Sound('Sounds/boom.wav')
-        self.soundWhoosh = pygame.mixer.Sound('Sounds/whoosh.wav')
+            images.load('Sprites/Menu/Quit-Selected.png')
+        self.soundEnter = sounds.effect('Sounds/boom.wav')
+        self.soundWhoosh = sounds.effect('Sounds/whoosh.wav')
+
+    # Play is picked every time the menu comes up
+
+    def enter(self):
         self.selectedIndex = 1
 
         # ENTER SANDMAN!
         # An A is deserved for this
 
-        pygame.mixer.music.load('Sounds/metallica.wav')
-        pygame.mixer.music.play(-1)
+        playMusic('Sounds/metallica.wav', -1)
 
     # Buttons are drawn based on selection
 
-    def draw(self, screen):
+    def draw(self, screen, alpha=1.0):
         screen.fill((0, 0, 0))
         screen.blit(self.backgroundMenu, (0, 0))
         screen.blit(self.buttonPlay, (467, 417))
@@ -1054,9 +1569,9 @@ class MainMenu(Screen):
 
             self.soundEnter.play()
             if self.selectedIndex is 1:
-                self.screenManager.set(Play(self.screenManager))
+                self.screenManager.show(Play)
             elif self.selectedIndex is 2:
-                self.screenManager.set(Store(self.screenManager))
+                self.screenManager.show(Store)
             elif self.selectedIndex is 3:
                 pygame.quit()
 